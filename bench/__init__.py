@@ -0,0 +1,7 @@
+# ==============================
+# bench - Performance tools for the Library App
+# ==============================
+# python -m bench             route benchmark on a synthetic library
+# python -m bench.soak        concurrent load against a real Waitress server
+# python -m bench.replay       replay Apache access logs in-process or over HTTP
+# python -m bench.highlight    per-chapter cost of code highlighting, cached and not
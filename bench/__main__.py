@@ -0,0 +1,3 @@
+from .routes import main
+
+main()
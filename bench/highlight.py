@@ -0,0 +1,133 @@
+# ==============================
+# bench/highlight.py - Per-chapter cost of code highlighting
+# ==============================
+# Usage:
+#   python -m bench.highlight
+#   python -m bench.highlight --chapters 200 --blocks 8 --snippets 20
+#
+# Writes chapters with fenced code blocks (drawn from a pool of snippets,
+# as tutorials repeat the same examples) and times render_markdown() for
+# each one in three setups:
+#
+#   plain      fences without highlighting (HIGHLIGHT off)
+#   uncached   Pygments on every block (HIGHLIGHT_CACHE_SIZE = 0)
+#   cached     blocks memoized by (language, code hash), as in production
+#
+# The render cache is not involved: every chapter is converted each time,
+# which is the cost a cache miss (first view, edit, eviction) pays.
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+from .synth import paragraph
+from .routes import summarize
+
+SNIPPETS = {
+    'python': [
+        "def title_from_name(name):\n    return name.replace('-', ' ').title()\n",
+        "for chapter in sorted(chapters, key=natural_key):\n    print(chapter['title'], chapter['path'])\n",
+        "class Page:\n    def __init__(self, path):\n        self.path = path\n\n    def __repr__(self):\n"
+        "        return f'<Page {self.path}>'\n",
+    ],
+    'javascript': [
+        "document.querySelectorAll('pre code').forEach((el) => {\n  el.classList.add('ready');\n});\n",
+        "const toc = await fetch(`/toc/${path}`).then((r) => r.json());\nconsole.log(toc.headings.length);\n",
+    ],
+    'bash': [
+        "python -m bench --scale small\npython -m library.bundle --purge\n",
+        "for f in books/*/*.md; do\n  wc -c \"$f\"\ndone\n",
+    ],
+    'html': [
+        '<nav aria-label="breadcrumb">\n  <ol class="breadcrumb">\n    <li class="breadcrumb-item">Home</li>\n'
+        '  </ol>\n</nav>\n',
+    ],
+}
+
+
+def snippet_pool(rng, size):
+    """size (language, code) pairs, variations of SNIPPETS."""
+    base = [(lang, code) for lang, codes in SNIPPETS.items() for code in codes]
+    pool = []
+    for i in range(size):
+        lang, code = base[i % len(base)]
+        if i >= len(base):
+            code += f"# variant {i}\n" if lang in ('python', 'bash') else f"// variant {i}\n"
+        pool.append((lang, code))
+    rng.shuffle(pool)
+    return pool
+
+
+def write_chapters(dest, chapters, blocks, pool, rng):
+    paths = []
+    for c in range(1, chapters + 1):
+        lines = [f"# Chapter {c}", ""]
+        for _ in range(blocks):
+            lang, code = rng.choice(pool)
+            lines.extend([paragraph(rng, 0), "", f"```{lang}", code.rstrip('\n'), "```", ""])
+        path = os.path.join(dest, f"chapter-{c}.md")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        paths.append(path)
+    return paths
+
+
+def time_setup(books_dir, paths, overrides):
+    from library import create_app
+    from library.render import render_markdown
+    app = create_app('production', BOOKS_DIR=books_dir, PREWARM=False, **overrides)
+    state = app.extensions['library']
+    latencies = []
+    with app.test_request_context():
+        # Imports and markdown extension setup are paid once, not by a setup
+        for path in paths[:5]:
+            render_markdown(path, os.path.splitext(os.path.basename(path))[0])
+    started = time.perf_counter()
+    with app.test_request_context():
+        for path in paths:
+            t0 = time.perf_counter()
+            render_markdown(path, os.path.splitext(os.path.basename(path))[0], state.html_filters)
+            latencies.append(time.perf_counter() - t0)
+    result = summarize(latencies, time.perf_counter() - started)
+    result['mean_ms'] = round(sum(latencies) / len(latencies) * 1000, 3)
+    if state.highlighter is not None and state.highlighter.cache.maxsize:
+        cache = state.highlighter.cache
+        result['block_hits'] = cache.hits
+        result['block_misses'] = cache.misses
+    return result
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Time chapter rendering with and without highlighting.')
+    parser.add_argument('--chapters', type=int, default=100)
+    parser.add_argument('--blocks', type=int, default=6, help='code blocks per chapter')
+    parser.add_argument('--snippets', type=int, default=24, help='distinct code blocks in the library')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    rng = random.Random(args.seed)
+    setups = {
+        'plain': {'HIGHLIGHT': False},
+        'uncached': {'HIGHLIGHT': True, 'HIGHLIGHT_CACHE_SIZE': 0},
+        'cached': {'HIGHLIGHT': True},
+    }
+    with tempfile.TemporaryDirectory(prefix='library-highlight-') as tmp:
+        paths = write_chapters(tmp, args.chapters, args.blocks, snippet_pool(rng, args.snippets), rng)
+        print(f"{args.chapters} chapters, {args.blocks} code blocks each, {args.snippets} distinct blocks")
+        results = {name: time_setup(tmp, paths, overrides) for name, overrides in setups.items()}
+
+    plain = results['plain']['mean_ms']
+    sys.stdout.write(f"{'setup':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'vs plain':>10} {'blocks hit/miss':>16}\n")
+    for name, r in results.items():
+        blocks = f"{r['block_hits']}/{r['block_misses']}" if 'block_hits' in r else ''
+        sys.stdout.write(f"{name:<10} {r['mean_ms']:>9.3f} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} "
+                         f"{r['mean_ms'] - plain:>+9.3f}ms {blocks:>16}\n")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+# ==============================
+# bench/replay.py - Replay real access logs against the app
+# ==============================
+# Usage:
+#   python -m bench.replay access.log                       # in-process, as fast as possible
+#   python -m bench.replay access.log --speed 1             # original timing
+#   python -m bench.replay access.log --speed 20 --url http://127.0.0.1:4040
+#   python -m bench.replay access.log --url https://example.org/library
+#   python -m bench.replay access.log --save var/replay-v1.json
+#   python -m bench.replay access.log --baseline var/replay-v1.json
+#
+# Reads Apache "combined"/"common" log lines (the format of the
+# httpd-conf.md setup, and of waitress behind TransLogger) as well as the
+# app's own JSON-lines access log (library/accesslog.py). Only GET and
+# HEAD requests are replayed. Login cookies in logs are never valid for
+# another instance, so every request gets --cookie instead. Latency is
+# reported per route group (/books, /search, /sitemap, ...), with the same
+# table and regression check as python -m bench.
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from .routes import summarize, compare, print_table
+
+LOG_PATTERN = re.compile(
+    r'^(?P<host>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<path>\S+)(?: [^"]*)?" (?P<status>\d{3}) \S+'
+)
+LOG_TIME_FORMAT = '%d/%b/%Y:%H:%M:%S %z'
+REPLAY_METHODS = ('GET', 'HEAD')
+SKIP_PATHS = ('/login', '/logout')
+
+
+# ==============================
+# LOG PARSING
+# ==============================
+def parse_log(lines):
+    """Yield (timestamp, method, path) for replayable requests."""
+    for line in lines:
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+                ts, method, path = record['ts'], record['method'], record['path']
+            except (ValueError, KeyError):
+                continue
+        else:
+            match = LOG_PATTERN.match(line)
+            if not match:
+                continue
+            method, path = match.group('method'), match.group('path')
+            try:
+                ts = datetime.strptime(match.group('time'), LOG_TIME_FORMAT).timestamp()
+            except ValueError:
+                continue
+        if method not in REPLAY_METHODS or path.split('?', 1)[0] in SKIP_PATHS:
+            continue
+        yield ts, method, path
+
+
+def route_group(path):
+    first = path.split('?', 1)[0].strip('/').split('/', 1)[0]
+    return first or 'home'
+
+
+# ==============================
+# TARGETS
+# ==============================
+class InProcessTarget:
+    """Calls the WSGI application directly through a test client per thread."""
+
+    def __init__(self, profile, cookie):
+        from library import create_app
+        # Replayed requests must not be appended to the log being replayed
+        self.app = create_app(profile, ACCESS_LOG=False, TRACE_SAMPLE_RATE=0.0)
+        self.cookie = cookie
+        self._local = threading.local()
+
+    def request(self, method, path):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+            for pair in self.cookie.split(';'):
+                name, _, value = pair.strip().partition('=')
+                if name:
+                    client.set_cookie(name, value)
+        response = client.open(path, method=method)
+        response.get_data()
+        return response.status_code
+
+
+class HttpTarget:
+    """Sends requests to a running server over keep-alive connections."""
+
+    def __init__(self, url, cookie):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        if parts.scheme == 'https':
+            self.connection_class, self.port = http.client.HTTPSConnection, parts.port or 443
+        else:
+            self.connection_class, self.port = http.client.HTTPConnection, parts.port or 80
+        # Mount point, e.g. /library under mod_wsgi
+        self.prefix = parts.path.rstrip('/')
+        self.cookie = cookie
+        self._local = threading.local()
+
+    def target_path(self, path):
+        """path below the mount point; Apache logs already include it."""
+        if not self.prefix or path == self.prefix or path.startswith(self.prefix + '/'):
+            return path
+        return self.prefix + path
+
+    def request(self, method, path):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self.connection_class(self.host, self.port, timeout=30)
+        path = self.target_path(path)
+        try:
+            conn.request(method, path, headers={'Cookie': self.cookie, 'Accept-Encoding': 'gzip'})
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+
+
+# ==============================
+# REPLAY
+# ==============================
+def replay(entries, target, speed, concurrency):
+    """
+    Send entries to target. speed=1 keeps the original gaps between
+    requests, speed=10 is ten times faster, speed=0 sends back to back.
+    Returns (latencies per group, status counts, error count, max
+    schedule lag, elapsed).
+    """
+    latencies = {}
+    statuses = {}
+    errors = [0]
+    lag = [0.0]
+    lock = threading.Lock()
+
+    def send(method, path):
+        t0 = time.perf_counter()
+        try:
+            status = target.request(method, path)
+        except Exception:
+            with lock:
+                errors[0] += 1
+            return
+        elapsed = time.perf_counter() - t0
+        with lock:
+            latencies.setdefault(route_group(path), []).append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status >= 500:
+                errors[0] += 1
+
+    started = time.monotonic()
+    first_ts = entries[0][0] if entries else 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for ts, method, path in entries:
+            if speed:
+                due = started + (ts - first_ts) / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    lag[0] = max(lag[0], -delay)
+            pool.submit(send, method, path)
+    return latencies, statuses, errors[0], lag[0], time.monotonic() - started
+
+
+# ==============================
+# ENTRY POINT
+# ==============================
+def build_parser():
+    parser = argparse.ArgumentParser(description='Replay access logs against the Library App.')
+    parser.add_argument('logs', nargs='+', help='access log files')
+    parser.add_argument('--url', help='replay over HTTP to this server instead of in-process')
+    parser.add_argument('--profile', default='production', help='create_app() profile for in-process replay')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='1 = original timing, 10 = ten times faster, 0 = as fast as possible')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--limit', type=int, help='replay only the first N requests')
+    parser.add_argument('--cookie', default='access_token=ok', help='Cookie header sent with every request')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='JSON file from an earlier --save to compare with')
+    parser.add_argument('--threshold', type=float, default=0.15)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    entries = []
+    for path in args.logs:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            entries.extend(parse_log(f))
+    entries.sort(key=lambda e: e[0])
+    if args.limit:
+        entries = entries[:args.limit]
+    if not entries:
+        sys.exit("No replayable requests found.")
+
+    if args.url:
+        target = HttpTarget(args.url, args.cookie)
+    else:
+        target = InProcessTarget(args.profile, args.cookie)
+    print(f"Replaying {len(entries)} requests "
+          f"({'original timing x%g' % args.speed if args.speed else 'back to back'}, "
+          f"concurrency {args.concurrency}) ...")
+
+    latencies, statuses, errors, lag, elapsed = replay(entries, target, args.speed, args.concurrency)
+    results = {group: summarize(values, elapsed) for group, values in sorted(latencies.items())}
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+    print(f"status {dict(sorted(statuses.items()))}, errors {errors}, "
+          f"max schedule lag {lag * 1000:.1f} ms, elapsed {elapsed:.1f}s")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'logs': args.logs, 'requests': len(entries), 'results': results}, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        for group, metric, base, current in regressions:
+            print(f"REGRESSION {group} {metric}: {base:.3f} -> {current:.3f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
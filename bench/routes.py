@@ -0,0 +1,185 @@
+# ==============================
+# bench/routes.py - Route-level benchmark through the Flask test client
+# ==============================
+# Usage:
+#   python -m bench --scale medium
+#   python -m bench --scale small --save-baseline var/bench-baseline.json
+#   python -m bench --scale small --baseline var/bench-baseline.json --threshold 0.15
+#
+# A synthetic library is generated in a temporary folder, the app is built
+# with create_app() pointing at it, and every route is timed in-process.
+# With --baseline the run fails (exit code 1) when a route's p50 or p95 is
+# more than --threshold slower than the stored baseline.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from .synth import SCALES, generate_library
+
+ROUTES = ('home', 'chapter', 'volume', 'search', 'search_cjk', 'sitemap')
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+# ==============================
+# ROUTE SCENARIOS
+# ==============================
+def route_paths(books_dir, seed=1):
+    """URL generators per route, chosen from the generated library."""
+    chapters, volumes = [], []
+    for book in sorted(os.listdir(books_dir)):
+        for volume in sorted(os.listdir(os.path.join(books_dir, book))):
+            volume_dir = os.path.join(books_dir, book, volume)
+            if not os.path.isdir(volume_dir):
+                continue
+            volumes.append(f"/books/{book}/{volume}")
+            for name in os.listdir(volume_dir):
+                if name.startswith('chapter-'):
+                    chapters.append(f"/books/{book}/{volume}/{name[:-3]}")
+    rng = random.Random(seed)
+    return {
+        'home': lambda: '/',
+        'chapter': lambda: rng.choice(chapters),
+        'volume': lambda: rng.choice(volumes),
+        'search': lambda: '/search?q=' + rng.choice(['voluptate', 'tempor', 'pariatur', 'zzznothing']),
+        'search_cjk': lambda: '/search?q=' + rng.choice(['図書館', '冒険', '春の雨']),
+        'sitemap': lambda: '/sitemap',
+    }
+
+
+def run_route(client, next_path, iterations, warmup):
+    for _ in range(warmup):
+        client.get(next_path())
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        path = next_path()
+        t0 = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - t0)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def run_benchmark(books_dir, profile, routes, iterations, warmup, overrides=None):
+    from library import create_app
+    # The benchmark measures the routes, not the writes to var/access.jsonl and var/traces.jsonl
+    settings = dict(BOOKS_DIR=books_dir, ACCESS_LOG=False, TRACE_SAMPLE_RATE=0.0)
+    settings.update(overrides or {})
+    app = create_app(profile, **settings)
+    client = app.test_client()
+    client.set_cookie('access_token', 'ok')
+    paths = route_paths(books_dir)
+    return {route: run_route(client, paths[route], iterations, warmup) for route in routes}
+
+
+# ==============================
+# BASELINE COMPARISON
+# ==============================
+def compare(results, baseline, threshold):
+    """Return a list of (route, metric, baseline, current) regressions."""
+    regressions = []
+    for route, current in results.items():
+        base = baseline.get('results', {}).get(route)
+        if not base:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if base[metric] and current[metric] > base[metric] * (1 + threshold):
+                regressions.append((route, metric, base[metric], current[metric]))
+    return regressions
+
+
+def print_table(results, baseline=None, out=sys.stdout):
+    base_results = (baseline or {}).get('results', {})
+    out.write(f"{'route':<12} {'req':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  {'p50 vs base':>11}\n")
+    for route, r in results.items():
+        delta = ''
+        base = base_results.get(route)
+        if base and base['p50_ms']:
+            delta = f"{(r['p50_ms'] / base['p50_ms'] - 1) * 100:+.1f}%"
+        out.write(f"{route:<12} {r['requests']:>6} {r['rps']:>9.1f} {r['p50_ms']:>9.3f} "
+                  f"{r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f}  {delta:>11}\n")
+
+
+# ==============================
+# ENTRY POINT
+# ==============================
+def build_parser():
+    parser = argparse.ArgumentParser(description='Benchmark Library App routes on a synthetic library.')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--books', type=int)
+    parser.add_argument('--volumes', type=int)
+    parser.add_argument('--chapters', type=int)
+    parser.add_argument('--chapter-kb', dest='chapter_kb', type=int)
+    parser.add_argument('--cjk-ratio', dest='cjk_ratio', type=float, default=0.3,
+                        help='share of paragraphs written in Japanese (0-1)')
+    parser.add_argument('--profile', default='production', help='create_app() profile')
+    parser.add_argument('--routes', default=','.join(ROUTES))
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--library', help='use (or generate into) this folder instead of a temp dir')
+    parser.add_argument('--baseline', help='JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='allowed slowdown vs baseline (0.15 = 15%%)')
+    parser.add_argument('--save-baseline', dest='save_baseline', help='write results to this JSON file')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    scale = dict(SCALES[args.scale])
+    for key in scale:
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+    routes = [r.strip() for r in args.routes.split(',') if r.strip()]
+    unknown = set(routes) - set(ROUTES)
+    if unknown:
+        sys.exit(f"Unknown routes: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix='library-bench-') as tmp:
+        books_dir = args.library or tmp
+        if not os.path.isdir(books_dir) or not os.listdir(books_dir):
+            os.makedirs(books_dir, exist_ok=True)
+            count = generate_library(books_dir, cjk_ratio=args.cjk_ratio, **scale)
+            print(f"Generated {count} chapters ({args.scale}: {scale}) in {books_dir}")
+        results = run_benchmark(books_dir, args.profile, routes, args.iterations, args.warmup)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'scale': scale, 'profile': args.profile, 'results': results}, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        for route, metric, base, current in regressions:
+            print(f"REGRESSION {route} {metric}: {base:.3f} -> {current:.3f} ms")
+        if regressions:
+            sys.exit(1)
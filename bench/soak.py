@@ -0,0 +1,244 @@
+# ==============================
+# bench/soak.py - Concurrent soak test against a real Waitress server
+# ==============================
+# Usage:
+#   python -m bench.soak --threads 4 --clients 32 --duration 60
+#   python -m bench.soak --workers 4 --mix chapter=60,search=30,sitemap=10
+#
+# Starts launcher.py on a local port (a synthetic library is generated
+# unless --library is given), then runs many keep-alive HTTP clients for a
+# fixed time. Reports throughput, tail latency, error rate and the server's
+# RSS every --interval seconds. Clients are Python threads, so for very
+# high rates run several soak processes side by side.
+#
+# The server runs --profile as is, on top of any LIBRARY_SETTINGS already
+# set; only its access log and traces are moved into the temporary folder.
+import os
+import sys
+import time
+import socket
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+
+from .synth import SCALES, generate_library
+from .routes import route_paths, summarize
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = 'chapter=70,search=20,sitemap=10'
+
+
+# ==============================
+# SERVER PROCESS
+# ==============================
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def write_settings(path, books_dir, scratch_dir, base_settings=None):
+    """
+    Settings file for the server under test: the operator's LIBRARY_SETTINGS
+    (if any), then the soak's library, with the access log and traces kept
+    in scratch_dir so the profile runs unchanged without writing to var/.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        if base_settings:
+            f.write(f"with open({base_settings!r}, 'rb') as _f:\n"
+                    f"    exec(compile(_f.read(), {base_settings!r}, 'exec'))\n")
+        f.write(f"BOOKS_DIR = {books_dir!r}\n")
+        f.write(f"ACCESS_LOG_FILE = {os.path.join(scratch_dir, 'access.jsonl')!r}\n")
+        f.write(f"TRACE_FILE = {os.path.join(scratch_dir, 'traces.jsonl')!r}\n")
+
+
+def start_server(books_dir, port, threads, workers, profile, settings_dir):
+    settings_file = os.path.join(settings_dir, 'soak_settings.py')
+    write_settings(settings_file, books_dir, settings_dir, os.environ.get('LIBRARY_SETTINGS'))
+    env = dict(os.environ, LIBRARY_PROFILE=profile, LIBRARY_SETTINGS=settings_file)
+    cmd = [sys.executable, os.path.join(BASE_DIR, 'launcher.py'), '--host', '127.0.0.1',
+           '--port', str(port), '--threads', str(threads), '--workers', str(workers)]
+    return subprocess.Popen(cmd, cwd=BASE_DIR, env=env)
+
+
+def wait_for_port(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def process_tree_rss(pid):
+    """RSS in bytes of pid plus its direct children (pre-fork workers). Linux only."""
+    pids = [pid]
+    try:
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as f:
+                        if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                            pids.append(int(entry))
+                except (OSError, IndexError, ValueError):
+                    pass
+    except OSError:
+        return None
+    total = 0
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return total
+
+
+# ==============================
+# LOAD CLIENTS
+# ==============================
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.interval_count = 0
+
+    def add(self, latency, status):
+        with self.lock:
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.interval_count += 1
+
+    def error(self):
+        with self.lock:
+            self.errors += 1
+
+    def take_interval(self):
+        with self.lock:
+            count, self.interval_count = self.interval_count, 0
+        return count
+
+
+def client_loop(port, paths, mix, deadline, recorder, seed):
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    headers = {'Cookie': 'access_token=ok', 'Accept-Encoding': 'gzip'}
+    conn = None
+    while time.monotonic() < deadline:
+        path = paths[rng.choices(names, weights)[0]]()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            t0 = time.perf_counter()
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            recorder.add(time.perf_counter() - t0, response.status)
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            recorder.error()
+            if conn is not None:
+                conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+
+
+# ==============================
+# ENTRY POINT
+# ==============================
+def build_parser():
+    parser = argparse.ArgumentParser(description='Soak test the Library App under Waitress.')
+    parser.add_argument('--threads', type=int, default=4, help='Waitress threads per worker')
+    parser.add_argument('--workers', type=int, default=0, help='pre-fork workers (0 = single process)')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--interval', type=float, default=5, help='seconds between progress lines')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'weighted routes (default {DEFAULT_MIX})')
+    parser.add_argument('--profile', default='production')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--library', help='existing books folder instead of a generated one')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    with tempfile.TemporaryDirectory(prefix='library-soak-') as tmp:
+        books_dir = args.library or os.path.join(tmp, 'books')
+        if not args.library:
+            generate_library(books_dir, **SCALES[args.scale])
+        paths = route_paths(books_dir)
+        unknown = set(mix) - set(paths)
+        if unknown:
+            sys.exit(f"Unknown routes in --mix: {', '.join(sorted(unknown))}")
+
+        port = free_port()
+        server = start_server(books_dir, port, args.threads, args.workers, args.profile, tmp)
+        try:
+            if not wait_for_port(port):
+                sys.exit("Server did not start.")
+            print(f"Server pid {server.pid} on port {port}: {args.workers or 1} process(es) x "
+                  f"{args.threads} threads, {args.clients} clients, {args.duration:.0f}s")
+
+            recorder = Recorder()
+            started = time.monotonic()
+            deadline = started + args.duration
+            clients = [threading.Thread(target=client_loop,
+                                        args=(port, paths, mix, deadline, recorder, i), daemon=True)
+                       for i in range(args.clients)]
+            for t in clients:
+                t.start()
+
+            print(f"{'t':>6} {'req/s':>9} {'rss MB':>9}")
+            rss_samples = []
+            while any(t.is_alive() for t in clients):
+                time.sleep(args.interval)
+                rss = process_tree_rss(server.pid)
+                rss_samples.append(rss)
+                rate = recorder.take_interval() / args.interval
+                rss_text = f"{rss / 1048576:.1f}" if rss else 'n/a'
+                print(f"{time.monotonic() - started:>6.1f} {rate:>9.1f} {rss_text:>9}")
+            elapsed = time.monotonic() - started
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    result = summarize(recorder.latencies, elapsed)
+    total = result['requests'] + recorder.errors
+    failed = recorder.errors + sum(n for s, n in recorder.statuses.items() if s >= 500)
+    print()
+    print(f"requests   {result['requests']} in {elapsed:.1f}s ({result['rps']} req/s)")
+    print(f"latency    p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, "
+          f"max {max(recorder.latencies, default=0) * 1000:.3f} ms")
+    print(f"errors     {failed} ({failed / total * 100 if total else 0:.2f}%), "
+          f"status {dict(sorted(recorder.statuses.items()))}")
+    rss_values = [r for r in rss_samples if r]
+    if rss_values:
+        print(f"rss        start {rss_values[0] / 1048576:.1f} MB, end {rss_values[-1] / 1048576:.1f} MB, "
+              f"peak {max(rss_values) / 1048576:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
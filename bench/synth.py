@@ -0,0 +1,95 @@
+# ==============================
+# bench/synth.py - Synthetic library generator
+# ==============================
+# Writes books/volumes/chapters in the same layout as books/lorem-ipsum:
+#
+#   <dest>/book-1/README.md
+#   <dest>/book-1/volume-1/README.md
+#   <dest>/book-1/volume-1/chapter-1.md ... chapter-N.md
+#
+# Chapter text mixes Latin filler with Japanese (CJK) sentences so search
+# and markdown are exercised on both.
+import os
+import random
+
+LATIN_WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+    'incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud '
+    'exercitation ullamco laboris nisi aliquip ex ea commodo consequat duis aute irure '
+    'reprehenderit voluptate velit esse cillum fugiat nulla pariatur excepteur sint'
+).split()
+
+CJK_SENTENCES = (
+    '物語は静かな図書館の片隅で始まった。',
+    '彼女は古い本のページをゆっくりとめくった。',
+    '窓の外では春の雨が降り続いていた。',
+    '百聞は一見に如かず、と祖父はよく言っていた。',
+    'らいぶらりーの灯りが夜遅くまで消えなかった。',
+    '冒険の地図は最後の章に隠されていた。',
+)
+
+# books x volumes x chapters, chapter size in KB
+SCALES = {
+    'small': dict(books=3, volumes=2, chapters=10, chapter_kb=4),
+    'medium': dict(books=10, volumes=3, chapters=30, chapter_kb=8),
+    'large': dict(books=30, volumes=5, chapters=60, chapter_kb=16),
+}
+
+
+def paragraph(rng, cjk_ratio):
+    if rng.random() < cjk_ratio:
+        return ''.join(rng.choice(CJK_SENTENCES) for _ in range(rng.randint(3, 8)))
+    words = [rng.choice(LATIN_WORDS) for _ in range(rng.randint(40, 90))]
+    words[0] = words[0].capitalize()
+    return ' '.join(words) + '.'
+
+
+def chapter_text(rng, book, volume, chapter, chapter_kb, cjk_ratio):
+    lines = [
+        f"## Book {book} - Volume {volume}",
+        "",
+        "### Navigation",
+        "",
+        "- [Chapter List](./)",
+        "- [Volume List](../)",
+        "",
+        "---",
+        "",
+        f"### Chapter {chapter}: {paragraph(rng, 0)[:40].rstrip()}",
+        "",
+    ]
+    size = sum(len(line) for line in lines)
+    target = chapter_kb * 1024
+    while size < target:
+        text = paragraph(rng, cjk_ratio)
+        if rng.random() < 0.1:
+            text = '>' + text
+        lines.extend([text, ""])
+        size += len(text.encode('utf-8'))
+    return '\n'.join(lines)
+
+
+def generate_library(dest, books, volumes, chapters, chapter_kb, cjk_ratio=0.3, seed=1):
+    """Create the library under dest and return the number of chapters written."""
+    rng = random.Random(seed)
+    written = 0
+    for b in range(1, books + 1):
+        book_dir = os.path.join(dest, f"book-{b}")
+        os.makedirs(book_dir, exist_ok=True)
+        with open(os.path.join(book_dir, 'README.md'), 'w', encoding='utf-8') as f:
+            f.write(f"## Book {b} - Volume List\n\n")
+            f.write(paragraph(rng, cjk_ratio) + "\n\n")
+            for v in range(1, volumes + 1):
+                f.write(f"- [Volume {v}](./volume-{v})\n")
+        for v in range(1, volumes + 1):
+            volume_dir = os.path.join(book_dir, f"volume-{v}")
+            os.makedirs(volume_dir, exist_ok=True)
+            with open(os.path.join(volume_dir, 'README.md'), 'w', encoding='utf-8') as f:
+                f.write(f"## Book {b} - Volume {v} - Chapter List\n\n### Chapters\n\n")
+                for c in range(1, chapters + 1):
+                    f.write(f"- [Chapter {c}](./chapter-{c})\n")
+            for c in range(1, chapters + 1):
+                with open(os.path.join(volume_dir, f"chapter-{c}.md"), 'w', encoding='utf-8') as f:
+                    f.write(chapter_text(rng, b, v, c, chapter_kb, cjk_ratio))
+                written += 1
+    return written
@@ -0,0 +1,282 @@
+# ==============================
+# launcher.py - Production launcher for the Library App (Waitress)
+# ==============================
+# One place to start the app under Waitress instead of a hardcoded
+# serve(app, host='0.0.0.0', port=4040) in every entry script.
+#
+# Settings are read in this order (later wins):
+#   1. built-in defaults (DEFAULTS below)
+#   2. an INI file, [waitress] section   (--config or LIBRARY_LAUNCHER_CONFIG)
+#   3. environment variables             (LIBRARY_THREADS, LIBRARY_PORT, ...)
+#   4. command line flags                (--threads 8 --workers 4 ...)
+#
+# Example launcher.ini:
+#
+#   [waitress]
+#   host = 0.0.0.0
+#   port = 4040
+#   threads = 8
+#   connection_limit = 200
+#   backlog = 2048
+#   channel_timeout = 60
+#   socket_options = TCP_NODELAY=1, SO_KEEPALIVE=1
+#   workers = 4
+#   prewarm = yes
+#
+# With workers > 0 the launcher runs in pre-fork mode (POSIX only): the
+# parent binds one listening socket, warms the app, then forks N workers
+# that all serve from the same socket. Everything loaded before the fork
+# is shared copy-on-write between the workers.
+# Each worker keeps its own /metrics counters, labelled worker="<pid>"
+# (see library/instrument.py).
+#
+# Whether the catalog, search index and render cache are warmed is decided
+# by the app profile (PREWARM in library/config.py); prewarm = yes forces
+# it for profiles that do not.
+import os
+import sys
+import signal
+import socket
+import argparse
+import time
+import traceback
+import configparser
+
+# ------------------------------
+# Default settings
+# ------------------------------
+DEFAULTS = {
+    'host': '0.0.0.0',
+    'port': '4040',
+    'threads': '4',
+    'connection_limit': '100',
+    'backlog': '1024',
+    'channel_timeout': '120',
+    'socket_options': 'TCP_NODELAY=1',
+    'workers': '0',
+    'prewarm': 'no',
+}
+
+INT_SETTINGS = ['port', 'threads', 'connection_limit', 'backlog', 'channel_timeout', 'workers']
+ENV_PREFIX = 'LIBRARY_'
+CONFIG_ENV = 'LIBRARY_LAUNCHER_CONFIG'
+MIN_WORKER_LIFETIME = 2.0  # seconds
+
+
+# ==============================
+# SETTINGS LOADING
+# ==============================
+def parse_bool(value):
+    return str(value).strip().lower() in ('1', 'yes', 'true', 'on')
+
+
+def parse_socket_options(value):
+    """
+    Turn "TCP_NODELAY=1, SO_KEEPALIVE=1" into a list of
+    (level, option, value) tuples for setsockopt().
+    """
+    options = []
+    for item in str(value).split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, raw = item.partition('=')
+        name = name.strip().upper()
+        optname = getattr(socket, name, None)
+        if optname is None:
+            raise ValueError(f"Unknown socket option: {name}")
+        if name.startswith('TCP_'):
+            level = socket.IPPROTO_TCP
+        else:
+            level = socket.SOL_SOCKET
+        options.append((level, optname, int(raw.strip() or 1)))
+    return options
+
+
+def load_settings(config_path=None, overrides=None):
+    settings = dict(DEFAULTS)
+
+    config_path = config_path or os.environ.get(CONFIG_ENV)
+    if config_path:
+        parser = configparser.ConfigParser()
+        if not parser.read(config_path, encoding='utf-8'):
+            raise FileNotFoundError(f"Launcher config not found: {config_path}")
+        if parser.has_section('waitress'):
+            settings.update(parser.items('waitress'))
+
+    for key in DEFAULTS:
+        env_value = os.environ.get(ENV_PREFIX + key.upper())
+        if env_value is not None:
+            settings[key] = env_value
+
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            settings[key] = value
+
+    for key in INT_SETTINGS:
+        settings[key] = int(settings[key])
+    settings['prewarm'] = parse_bool(settings['prewarm'])
+    settings['socket_options'] = parse_socket_options(settings['socket_options'])
+    return settings
+
+
+def serve_kwargs(settings):
+    """Waitress tuning arguments shared by single-process and worker mode."""
+    return {
+        'threads': settings['threads'],
+        'connection_limit': settings['connection_limit'],
+        'backlog': settings['backlog'],
+        'channel_timeout': settings['channel_timeout'],
+    }
+
+
+# ==============================
+# APP LOADING AND PREWARM
+# ==============================
+def load_app():
+    from library import create_app
+    return create_app()
+
+
+def prewarm(app):
+    """Warm the app unless its profile already did so in create_app()."""
+    import library
+    if app.extensions['library'].warm:
+        return 0
+    return library.prewarm(app)
+
+
+# ==============================
+# LISTENING SOCKET
+# ==============================
+# The launcher binds the socket itself (in both modes) so the same socket
+# can be shared by pre-forked workers. Socket options are set on the
+# listening socket; Linux copies them to every accepted connection.
+def bind_socket(settings):
+    family = socket.AF_INET6 if ':' in settings['host'] else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    for level, optname, value in settings['socket_options']:
+        sock.setsockopt(level, optname, value)
+    sock.bind((settings['host'], settings['port']))
+    sock.listen(settings['backlog'])
+    return sock
+
+
+# ==============================
+# PRE-FORK SERVER
+# ==============================
+def run_worker(app, sock, settings):
+    from waitress import serve
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    status = 0
+    try:
+        serve(app, sockets=[sock], **serve_kwargs(settings))
+    except Exception:
+        traceback.print_exc()
+        status = 1
+    finally:
+        os._exit(status)
+
+
+def spawn_worker(app, sock, settings):
+    pid = os.fork()
+    if pid == 0:
+        run_worker(app, sock, settings)
+    return pid, time.monotonic()
+
+
+def run_prefork(app, settings):
+    sock = bind_socket(settings)
+    print(f"Starting {settings['workers']} Waitress workers on "
+          f"{settings['host']}:{settings['port']} ({settings['threads']} threads each) ...")
+
+    workers = {}
+    stopping = []
+
+    def shutdown(signum, frame):
+        stopping.append(signum)
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for _ in range(settings['workers']):
+        pid, started = spawn_worker(app, sock, settings)
+        workers[pid] = started
+
+    # Supervise: restart workers that die unless we are shutting down.
+    # A worker dying right after start means it cannot serve at all, so
+    # stop instead of fork-looping.
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if stopping or started is None:
+            continue
+        if time.monotonic() - started < MIN_WORKER_LIFETIME:
+            print(f"Worker {pid} exited right after start (status {status}), shutting down.")
+            shutdown(signal.SIGTERM, None)
+            continue
+        print(f"Worker {pid} exited (status {status}), restarting ...")
+        pid, started = spawn_worker(app, sock, settings)
+        workers[pid] = started
+
+    sock.close()
+
+
+# ==============================
+# ENTRY POINT
+# ==============================
+def build_parser():
+    parser = argparse.ArgumentParser(description='Run the Library App under Waitress.')
+    parser.add_argument('--config', help='INI file with a [waitress] section')
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--connection-limit', dest='connection_limit', type=int)
+    parser.add_argument('--backlog', type=int)
+    parser.add_argument('--channel-timeout', dest='channel_timeout', type=int)
+    parser.add_argument('--socket-options', dest='socket_options',
+                        help='e.g. "TCP_NODELAY=1, SO_KEEPALIVE=1"')
+    parser.add_argument('--workers', type=int, help='pre-fork N workers (0 = single process)')
+    parser.add_argument('--prewarm', action='store_const', const='yes',
+                        help='warm caches before serving even if the profile does not')
+    return parser
+
+
+def main(app=None, argv=None):
+    args = vars(build_parser().parse_args(argv))
+    config_path = args.pop('config')
+    settings = load_settings(config_path, args)
+
+    app = app or load_app()
+
+    if settings['prewarm']:
+        count = prewarm(app)
+        if count:
+            print(f"Prewarmed {count} pages.")
+
+    if settings['workers'] > 0:
+        if not hasattr(os, 'fork'):
+            sys.exit("Pre-fork mode needs os.fork(); set workers = 0 on this platform.")
+        run_prefork(app, settings)
+        return
+
+    from waitress import serve
+    sock = bind_socket(settings)
+    print(f"Starting Waitress server on {settings['host']}:{settings['port']} ...")
+    serve(app, sockets=[sock], **serve_kwargs(settings))
+
+
+if __name__ == '__main__':
+    main()
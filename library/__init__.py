@@ -0,0 +1,139 @@
+# ==============================
+# library - Flask Library App with Global Login
+# ==============================
+# All entry points (app.py, app-for-debian-waitress.py,
+# app-for-win-mod-wsgi.py, flaskapp.wsgi, launcher.py) build the app with
+# create_app(), so performance settings live in one place: the profile in
+# library/config.py plus an optional LIBRARY_SETTINGS file.
+import os
+from flask import Flask
+from jinja2 import ChoiceLoader, FileSystemLoader
+
+from .config import PROFILES, DEFAULT_PROFILE, PROFILE_ENV, SETTINGS_ENV, PREWARM_ENVIRON
+from .catalog import Catalog
+from .render import RenderCache
+from .search import make_search
+from .compress import init_compression
+from .instrument import init_instrumentation
+from .tracing import init_tracing
+from .accesslog import init_access_log
+from .profiler import init_profiler
+from .diagnostics import init_diagnostics
+from .health import init_health
+from .admission import init_admission
+from .assets import init_assets, init_bundle, init_fonts
+from .images import init_images
+from .highlight import init_highlight
+from .minify import init_minify
+from .export import init_export
+from .views import register_views
+
+
+class LibraryState:
+    """Shared per-app objects, stored in app.extensions['library']."""
+
+    def __init__(self, config):
+        self.catalog = Catalog(config['BOOKS_DIR'], ttl=config['CATALOG_TTL'])
+        self.render_cache = RenderCache(config['RENDER_CACHE_SIZE'])
+        self.layout_cache = RenderCache(config['LAYOUT_CACHE_SIZE'])
+        self.search = make_search(config['SEARCH_BACKEND'], self.catalog)
+        self.warm = False
+        self.metrics = None
+        self.access_log = None
+        self.assets = None
+        self.images = None
+        self.highlighter = None
+        # (name, function) steps applied to rendered markdown before caching
+        self.html_filters = []
+        # Endpoints reachable without the login cookie (see require_login)
+        self.public_endpoints = {'login', 'logout', 'static'}
+
+
+# ==============================
+# APPLICATION FACTORY
+# ==============================
+def create_app(config=None, **overrides):
+    """
+    Build the app for a profile name ('dev', 'production'), a config
+    class, or None to use $LIBRARY_PROFILE. Keyword arguments override
+    single settings, e.g. create_app('dev', PASSWORD_ENABLED=False).
+    """
+    if config is None or isinstance(config, str):
+        name = config or os.environ.get(PROFILE_ENV, DEFAULT_PROFILE)
+        if name not in PROFILES:
+            raise ValueError(f"Unknown profile {name!r}, expected one of {sorted(PROFILES)}")
+        config = PROFILES[name]
+
+    app = Flask(__name__, root_path=config.BASE_DIR,
+                template_folder=config.TEMPLATE_DIRS[0], static_folder=config.STATIC_DIR)
+    app.config.from_object(config)
+    app.config.from_envvar(SETTINGS_ENV, silent=True)
+    app.config.update(overrides)
+    app.jinja_loader = ChoiceLoader([FileSystemLoader(d) for d in app.config['TEMPLATE_DIRS']])
+
+    state = LibraryState(app.config)
+    app.extensions['library'] = state
+
+    if app.config['INSTRUMENTATION']:
+        init_instrumentation(app, state)
+    if app.config['ACCESS_LOG']:
+        init_access_log(app, state)
+    if app.config['TRACE_SAMPLE_RATE']:
+        init_tracing(app)
+    if app.config['ADMIN_SECRET']:
+        init_profiler(app, state)
+        init_diagnostics(app, state)
+    if app.config['COMPRESS']:
+        init_compression(app)
+    if app.config['STATIC_FINGERPRINT']:
+        init_assets(app, state)
+    if app.config['ASSET_BUNDLE']:
+        init_bundle(app)
+    if app.config['SELF_HOSTED_FONTS']:
+        init_fonts(app)
+    init_images(app, state)
+    if app.config['HIGHLIGHT']:
+        init_highlight(app, state)
+    if app.config['HTML_MINIFY']:
+        init_minify(app, state)
+    init_export(app, state)
+    register_views(app, state)
+    if app.config['ADMISSION_LIMITS']:
+        init_admission(app, state)
+    init_health(app, state)
+
+    if app.config['PREWARM']:
+        prewarm(app)
+    return app
+
+
+# ==============================
+# PREWARM
+# ==============================
+def prewarm(app):
+    """
+    Scan the catalog, build the search index and render every page once,
+    so templates are compiled and the render cache is full before the
+    first reader arrives (and before the launcher forks workers).
+    Returns the number of pages rendered.
+    """
+    state = app.extensions['library']
+    snap = state.catalog.refresh()
+    state.search.build()
+
+    paths = ['/', '/sitemap', '/tags']
+    for url_path, _ in snap.files:
+        parts = url_path.split('/')
+        for i in range(1, len(parts)):
+            paths.append('/books/' + '/'.join(parts[:i]))
+        if parts[-1].lower() != 'readme':
+            paths.append('/books/' + url_path)
+    paths = list(dict.fromkeys(paths))
+
+    client = app.test_client()
+    client.environ_base[PREWARM_ENVIRON] = True
+    client.set_cookie('access_token', 'ok')
+    for path in paths:
+        client.get(path)
+    state.warm = True
+    return len(paths)
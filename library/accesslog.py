@@ -0,0 +1,204 @@
+# ==============================
+# library/accesslog.py - Structured access log, written in the background
+# ==============================
+# Each request puts one small dict on a bounded queue; a background thread
+# writes them to ACCESS_LOG_FILE as JSON lines in batches. When the queue
+# is full the record is dropped and counted instead of making the reader
+# wait for the disk (or journald).
+#
+#   {"ts": 1760000000.123, "method": "GET", "endpoint": "render_md",
+#    "path": "/books/...", "status": 200, "bytes": 4399,
+#    "duration_ms": 3.2, "cache": "hit", "ua": "browser"}
+#
+# Streamed responses are logged once their last chunk has been sent, with
+# the bytes actually sent; duration_ms is the time until the view returned.
+import os
+import re
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+from urllib.parse import urlencode
+from flask import g, request
+
+from .config import PREWARM_ENVIRON
+
+UA_CLASSES = (
+    ('bot', re.compile(r'bot|crawl|spider|slurp|monitor', re.IGNORECASE)),
+    ('cli', re.compile(r'curl|wget|python|httpie|go-http|java/', re.IGNORECASE)),
+    ('mobile', re.compile(r'mobile|android|iphone|ipad', re.IGNORECASE)),
+    ('browser', re.compile(r'mozilla|opera', re.IGNORECASE)),
+)
+
+
+# Admin credentials (library/admin.py, library/profiler.py) never reach the log
+REDACTED_PARAMS = {'secret', '_profile'}
+
+
+def count_chunks(body, counted, charset):
+    try:
+        for chunk in body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            counted[0] += len(chunk)
+            yield chunk
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+
+
+def on_body_sent(response, callback):
+    """
+    callback(bytes) once the response body has been sent. Streamed bodies
+    (?all=1 volumes, first export downloads) have no Content-Length, so
+    their chunks are counted as they go out and the callback runs when
+    the server closes the response.
+    """
+    if not response.is_streamed or response.content_length is not None:
+        callback(response.content_length or 0)
+        return
+    counted = getattr(response, 'library_sent', None)
+    if counted is None:
+        counted = response.library_sent = [0]
+        response.response = count_chunks(response.response, counted,
+                                         response.mimetype_params.get('charset', 'utf-8'))
+    response.call_on_close(lambda: callback(counted[0]))
+
+
+def logged_path(req):
+    """Path and query string without the REDACTED_PARAMS."""
+    query = [(k, v) for k, v in req.args.items(multi=True) if k not in REDACTED_PARAMS]
+    return req.path + ('?' + urlencode(query) if query else '')
+
+
+def user_agent_class(user_agent):
+    if not user_agent:
+        return 'none'
+    for name, pattern in UA_CLASSES:
+        if pattern.search(user_agent):
+            return name
+    return 'other'
+
+
+# ==============================
+# BACKGROUND WRITER
+# ==============================
+class AccessLogger:
+    def __init__(self, path, maxsize=10000, batch_size=200, flush_interval=1.0):
+        self.path = path
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # The launcher forks workers after create_app(); threads do not
+        # survive a fork, so each process starts its own writer.
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(self.maxsize)
+            self._thread = threading.Thread(target=self._run, name='access-log', daemon=True)
+            self._thread.start()
+
+    def log(self, record):
+        if self._pid != os.getpid():
+            self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        q = self._queue
+        out = None
+        while True:
+            batch = [q.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(q.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            stop = None in batch
+            records = [r for r in batch if r is not None]
+            if records:
+                if out is None:
+                    out = self._open()
+                out.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records))
+                out.flush()
+                self.written += len(records)
+            for _ in batch:
+                q.task_done()
+            if stop:
+                return
+
+    def _open(self):
+        if self.path == '-':
+            return sys.stdout
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        return open(self.path, 'a', encoding='utf-8')
+
+    def close(self, timeout=5.0):
+        """Flush what is queued; called at interpreter exit."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+# ==============================
+# REQUEST HOOKS
+# ==============================
+def init_access_log(app, state):
+    logger = state.access_log = AccessLogger(
+        app.config['ACCESS_LOG_FILE'],
+        maxsize=app.config['ACCESS_LOG_QUEUE'],
+        batch_size=app.config['ACCESS_LOG_BATCH'],
+        flush_interval=app.config['ACCESS_LOG_FLUSH_INTERVAL'],
+    )
+
+    @app.before_request
+    def start_access_log():
+        if request.environ.get(PREWARM_ENVIRON):
+            return
+        g.access_started = time.perf_counter()
+
+    @app.after_request
+    def write_access_log(response):
+        started = g.pop('access_started', None)
+        if started is None:
+            return response
+        record = {
+            'ts': round(time.time(), 3),
+            'method': request.method,
+            'endpoint': request.endpoint or 'none',
+            'path': logged_path(request),
+            'status': response.status_code,
+            'bytes': 0,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+            'cache': g.get('render_cache', 'none'),
+            'ua': user_agent_class(request.headers.get('User-Agent')),
+        }
+
+        def log(sent):
+            record['bytes'] = sent
+            logger.log(record)
+
+        on_body_sent(response, log)
+        return response
@@ -0,0 +1,61 @@
+# ==============================
+# library/admin.py - Admin secret check
+# ==============================
+# Diagnostics pages are reachable without the reader login but need
+# ADMIN_SECRET, sent as an X-Admin-Secret header or a ?secret= query
+# parameter. With no ADMIN_SECRET configured they are disabled (404).
+#
+# The secret is never put into links or redirects. A browser that opens a
+# page with ?secret= gets a signed admin cookie (valid ADMIN_TOKEN_MAX_AGE
+# seconds) and is redirected to the same URL without the secret; later
+# pages, forms and redirects are authenticated by that cookie.
+import hmac
+from urllib.parse import urlencode
+from flask import current_app, request, abort, redirect, after_this_request
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+
+ADMIN_HEADER = 'X-Admin-Secret'
+ADMIN_COOKIE = 'admin_token'
+
+
+def secret_matches(value, secret):
+    # Compared as bytes: compare_digest rejects non-ASCII str with TypeError
+    return bool(secret) and bool(value) and hmac.compare_digest(value.encode('utf-8'), secret.encode('utf-8'))
+
+
+def token_serializer(secret):
+    return URLSafeTimedSerializer(secret, salt='library-admin')
+
+
+def token_matches(token, secret, max_age):
+    try:
+        return token_serializer(secret).loads(token, max_age=max_age) == 'admin'
+    except BadSignature:
+        return False
+
+
+def set_admin_cookie(response):
+    config = current_app.config
+    response.set_cookie(ADMIN_COOKIE, token_serializer(config['ADMIN_SECRET']).dumps('admin'),
+                        max_age=config['ADMIN_TOKEN_MAX_AGE'], httponly=True, samesite='Strict',
+                        secure=request.is_secure, path=request.script_root or '/')
+    return response
+
+
+def require_admin():
+    config = current_app.config
+    secret = config['ADMIN_SECRET']
+    if not secret:
+        abort(404)
+    if secret_matches(request.headers.get(ADMIN_HEADER, ''), secret):
+        return
+    if token_matches(request.cookies.get(ADMIN_COOKIE, ''), secret, config['ADMIN_TOKEN_MAX_AGE']):
+        return
+    if not secret_matches(request.args.get('secret', ''), secret):
+        abort(403)
+    if request.method != 'GET':
+        after_this_request(set_admin_cookie)
+        return
+    # Swap the secret in the URL for the cookie
+    query = urlencode([(k, v) for k, v in request.args.items(multi=True) if k != 'secret'])
+    abort(set_admin_cookie(redirect(request.script_root + request.path + (f'?{query}' if query else ''))))
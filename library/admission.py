@@ -0,0 +1,89 @@
+# ==============================
+# library/admission.py - Per-endpoint concurrency limits
+# ==============================
+# A burst of expensive requests (search) must not take every Waitress
+# thread. Each limited endpoint gets a number of slots and a short wait
+# queue:
+#
+#   ADMISSION_LIMITS = {'search': 2, 'sitemap': 4, 'render_md': 8}
+#
+# A request that finds no free slot waits up to ADMISSION_WAIT seconds
+# (at most ADMISSION_QUEUE requests wait per endpoint), then gets
+# 503 + Retry-After. Chapters already in the render cache cost almost
+# nothing, so they always skip the limit.
+import threading
+from flask import g, request, Response
+
+from .render import resolve_md_file, file_stamp, cache_key
+
+
+class Gate:
+    def __init__(self, limit, max_waiting, wait):
+        self.slots = threading.BoundedSemaphore(limit)
+        self.max_waiting = max_waiting
+        self.wait = wait
+        self.waiting = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        if self.slots.acquire(blocking=False):
+            return True
+        with self._lock:
+            if self.waiting >= self.max_waiting:
+                return False
+            self.waiting += 1
+        try:
+            return self.slots.acquire(timeout=self.wait)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def leave(self):
+        self.slots.release()
+
+
+def is_cached_chapter(state, books_dir):
+    """True when render_md would be served straight from the render cache."""
+    if request.args.get('all') == '1':
+        return False
+    md_path = request.view_args.get('md_path', '') if request.view_args else ''
+    md_file = resolve_md_file(books_dir, md_path)
+    try:
+        return state.render_cache.contains(cache_key(md_path), file_stamp(md_file))
+    except OSError:
+        return False
+
+
+def init_admission(app, state):
+    wait = app.config['ADMISSION_WAIT']
+    max_waiting = app.config['ADMISSION_QUEUE']
+    retry_after = str(app.config['ADMISSION_RETRY_AFTER'])
+    books_dir = app.config['BOOKS_DIR']
+    gates = {endpoint: Gate(limit, max_waiting, wait)
+             for endpoint, limit in app.config['ADMISSION_LIMITS'].items()}
+
+    rejected = None
+    if state.metrics:
+        rejected = state.metrics.counter('library_admission_rejected_total',
+                                         'Requests turned away with 503 by admission control.',
+                                         ['endpoint'])
+
+    @app.before_request
+    def admit_request():
+        gate = gates.get(request.endpoint)
+        if gate is None:
+            return
+        if request.endpoint == 'render_md' and is_cached_chapter(state, books_dir):
+            return
+        if not gate.enter():
+            if rejected:
+                rejected.inc(request.endpoint)
+            return Response('Server busy, please retry.\n', status=503,
+                            headers={'Retry-After': retry_after}, mimetype='text/plain')
+        g.admission_gate = gate
+
+    @app.teardown_request
+    def release_request(exc):
+        gate = g.pop('admission_gate', None)
+        if gate is not None:
+            gate.leave()
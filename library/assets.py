@@ -0,0 +1,172 @@
+# ==============================
+# library/assets.py - Fingerprinted static URLs and the CSS/JS bundle
+# ==============================
+# At startup every file under static/ is hashed once, and
+#
+#   url_for('static', filename='css/main.css')  ->  /static/css/main.3f2a9c1b0d.css
+#
+# The fingerprinted name changes whenever the file does, so it is served
+# with "Cache-Control: public, max-age=31536000, immutable" and browsers
+# never revalidate it. Plain (unhashed) URLs keep working with Flask's
+# normal caching. Files edited while the app runs keep their old hash
+# until restart, so only the production profile turns this on. Files
+# that already carry a hash in their name (name.<hash>.ext, e.g. the
+# vendored fonts) keep their URL and are served as immutable too.
+import os
+import re
+import json
+import hashlib
+from flask import send_from_directory
+
+HASH_LENGTH = 10
+IMMUTABLE_MAX_AGE = 31536000
+# Written by python -m library.bundle / python -m library.fonts
+BUNDLE_DIR = 'dist'
+FONT_DIR = 'fonts'
+# Files in the bundle, in the order base.html loads them
+BUNDLE_CSS = [
+    'vendor/bootstrap/css/bootstrap.min.css',
+    'vendor/bootstrap-icons/bootstrap-icons.css',
+    'css/main.css',
+    'css/style.css',
+    'css/mode.css',
+    'css/highlight.css',
+]
+BUNDLE_JS = [
+    'vendor/bootstrap/js/bootstrap.bundle.min.js',
+    'js/main.js',
+    'js/mode.js',
+]
+# Digests of every input the bundle was built from (sources, and the
+# templates/code scanned for used classes when purging)
+BUNDLE_MANIFEST = 'bundle.json'
+HASHED_NAME = re.compile(r'\.[0-9a-f]{%d}\.[^./]+$' % HASH_LENGTH)
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()[:HASH_LENGTH]
+
+
+def fingerprinted_name(filename, digest):
+    base, ext = os.path.splitext(filename)
+    return f"{base}.{digest}{ext}"
+
+
+class StaticManifest:
+    """Maps static filenames to fingerprinted names and back."""
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self.urls = {}       # 'css/main.css' -> 'css/main.<hash>.css'
+        self.files = {}      # 'css/main.<hash>.css' -> 'css/main.css'
+        self.build()
+
+    def build(self):
+        urls, files = {}, {}
+        for root, _, names in os.walk(self.static_dir):
+            for name in names:
+                full_path = os.path.join(root, name)
+                filename = os.path.relpath(full_path, self.static_dir).replace(os.sep, '/')
+                if HASHED_NAME.search(filename):
+                    hashed = filename
+                else:
+                    hashed = fingerprinted_name(filename, file_digest(full_path))
+                urls[filename] = hashed
+                files[hashed] = filename
+        self.urls, self.files = urls, files
+        return len(urls)
+
+
+def init_assets(app, state):
+    manifest = state.assets = StaticManifest(app.static_folder)
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == 'static':
+            filename = values.get('filename')
+            if filename in manifest.urls:
+                values['filename'] = manifest.urls[filename]
+
+    def static(filename):
+        original = manifest.files.get(filename)
+        if original is None:
+            return app.send_static_file(filename)
+        response = send_from_directory(app.static_folder, original, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
+
+
+# ==============================
+# BUNDLE
+# ==============================
+def stale_bundle_inputs(static_dir):
+    """
+    Inputs that changed since the bundle was built (or a reason it cannot
+    be used); an empty list means the bundle is current.
+    """
+    out_dir = os.path.join(static_dir, BUNDLE_DIR)
+    if not all(os.path.exists(os.path.join(out_dir, n)) for n in ('bundle.css', 'bundle.js')):
+        return ['bundle.css/bundle.js missing']
+    try:
+        with open(os.path.join(out_dir, BUNDLE_MANIFEST), encoding='utf-8') as f:
+            inputs = json.load(f)['inputs']
+    except (OSError, ValueError, KeyError):
+        return [f'{BUNDLE_MANIFEST} missing']
+    stale = [name for name in BUNDLE_CSS + BUNDLE_JS if name not in inputs]
+    for name, digest in inputs.items():
+        path = os.path.normpath(os.path.join(static_dir, name))
+        if not os.path.exists(path) or file_digest(path) != digest:
+            stale.append(name)
+    return stale
+
+
+def init_bundle(app):
+    """
+    Let base.html link static/dist/bundle.css and bundle.js (built by
+    python -m library.bundle) instead of the individual files. A bundle
+    older than any of its inputs is not used: the individual files are
+    linked instead, so a forgotten rebuild never serves stale CSS/JS.
+    """
+    stale = stale_bundle_inputs(app.static_folder)
+    found = not stale
+    if stale:
+        app.logger.warning("ASSET_BUNDLE is on but static/%s is missing or out of date (%s); "
+                           "linking the individual files, run python -m library.bundle",
+                           BUNDLE_DIR, ', '.join(stale[:5]))
+
+    @app.context_processor
+    def inject_asset_bundle():
+        return dict(asset_bundle=found)
+
+
+# ==============================
+# FONTS
+# ==============================
+def init_fonts(app):
+    """
+    Let base.html use static/fonts (built by python -m library.fonts)
+    instead of the Google Fonts stylesheets.
+    """
+    manifest_path = os.path.join(app.static_folder, FONT_DIR, 'fonts.json')
+    fonts = None
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        fonts = {
+            'css': f"{FONT_DIR}/{manifest['css']}",
+            'preload': [f"{FONT_DIR}/{name}" for name in manifest['preload']],
+        }
+    except (OSError, ValueError, KeyError):
+        app.logger.warning("SELF_HOSTED_FONTS is on but %s is missing; "
+                           "run python -m library.fonts", manifest_path)
+
+    @app.context_processor
+    def inject_fonts():
+        return dict(self_hosted_fonts=fonts)
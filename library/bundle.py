@@ -0,0 +1,351 @@
+# ==============================
+# library/bundle.py - Build the CSS/JS bundle for base.html
+# ==============================
+# Usage:
+#   python -m library.bundle            # static/dist/bundle.css + bundle.js
+#   python -m library.bundle --purge    # also drop unused Bootstrap rules
+#   python -m library.bundle --purge --keep carousel-item --keep bi-github
+#
+# Writes css/highlight.css for HIGHLIGHT_STYLE (library/highlight.py),
+# then concatenates the stylesheets and scripts base.html loads (in the
+# same order) and minifies them, so a page needs two requests instead of ten.
+# With --purge, rules in the vendor stylesheets whose class selectors
+# never appear in app/, templates/, library/*.py or the bundled scripts
+# are dropped; our own CSS is kept whole. Selectors without classes
+# (h1, table, pre, ...) always survive, since rendered markdown uses them.
+#
+# The digests of every input go to static/dist/bundle.json. When
+# ASSET_BUNDLE is on and none of them changed since, base.html links the
+# bundle instead of the individual files (see library/assets.py).
+import os
+import re
+import sys
+import glob
+import json
+import argparse
+
+from .config import Config
+from .highlight import highlight, write_stylesheet, CSS_FILE as HIGHLIGHT_CSS
+from .assets import BUNDLE_DIR, BUNDLE_CSS as CSS_FILES, BUNDLE_JS as JS_FILES, BUNDLE_MANIFEST, file_digest
+PURGE_FILES = ('vendor/',)
+NESTED_AT_RULES = ('@media', '@supports', '@layer', '@container')
+
+
+# ==============================
+# CSS PARSING
+# ==============================
+def skip_string(text, i):
+    """Index just past the string literal starting at text[i]."""
+    quote = text[i]
+    i += 1
+    while i < len(text) and text[i] != quote:
+        i += 2 if text[i] == '\\' else 1
+    return i + 1
+
+
+def strip_comments(css):
+    """Remove comments, keeping /*! license */ ones."""
+    out = []
+    i = 0
+    while i < len(css):
+        ch = css[i]
+        if ch in '"\'':
+            end = skip_string(css, i)
+            out.append(css[i:end])
+            i = end
+        elif css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            end = len(css) if end < 0 else end + 2
+            if css.startswith('/*!', i):
+                out.append(css[i:end] + '\n')
+            i = end
+        else:
+            out.append(ch)
+            i += 1
+    return ''.join(out)
+
+
+def parse_css(css, i=0):
+    """
+    Split css into nodes: ('at', text) for @charset/@import statements,
+    ('comment', text), ('block', prelude, children) for @media and
+    friends, and ('rule', prelude, body) for everything else.
+    Returns (nodes, index after the closing brace).
+    """
+    nodes = []
+    start = i
+    while i < len(css):
+        ch = css[i]
+        if ch in '"\'':
+            i = skip_string(css, i)
+        elif css.startswith('/*!', i):
+            end = css.find('*/', i) + 2
+            nodes.append(('comment', css[i:end]))
+            i = start = end
+        elif ch == ';':
+            statement = css[start:i].strip()
+            if statement:
+                nodes.append(('at', statement))
+            i = start = i + 1
+        elif ch == '{':
+            prelude = css[start:i].strip()
+            if prelude.startswith(NESTED_AT_RULES):
+                children, i = parse_css(css, i + 1)
+                nodes.append(('block', prelude, children))
+            else:
+                body_start = i + 1
+                depth = 1
+                i += 1
+                while i < len(css) and depth:
+                    if css[i] in '"\'':
+                        i = skip_string(css, i)
+                        continue
+                    depth += {'{': 1, '}': -1}.get(css[i], 0)
+                    i += 1
+                nodes.append(('rule', prelude, css[body_start:i - 1]))
+            start = i
+        elif ch == '}':
+            return nodes, i + 1
+        else:
+            i += 1
+    return nodes, i
+
+
+def split_outside(text, sep):
+    """Split on sep where it is not inside quotes, () or []."""
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(text):
+        ch = text[i]
+        if ch in '"\'':
+            i = skip_string(text, i)
+            continue
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+# ==============================
+# MINIFY
+# ==============================
+def squeeze(text, punctuation):
+    """Collapse whitespace outside strings and drop it around punctuation."""
+    out = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in '"\'':
+            end = skip_string(text, i)
+            out.append(text[i:end])
+            i = end
+        elif ch.isspace():
+            while i < len(text) and text[i].isspace():
+                i += 1
+            prev = out[-1][-1:] if out else ''
+            nxt = text[i:i + 1]
+            if prev and nxt and prev not in punctuation and nxt not in punctuation:
+                out.append(' ')
+        else:
+            out.append(ch)
+            i += 1
+    return ''.join(out)
+
+
+def minify_declarations(body):
+    if '{' in body:  # @font-face / @keyframes bodies with nested blocks
+        return squeeze(body, '{};:,').replace(';}', '}').rstrip(';')
+    return squeeze(body, ';:,').rstrip(';')
+
+
+def serialize(nodes):
+    out = []
+    for node in nodes:
+        if node[0] == 'comment':
+            out.append(node[1] + '\n')
+        elif node[0] == 'at':
+            out.append(squeeze(node[1], ',') + ';')
+        elif node[0] == 'block':
+            out.append(squeeze(node[1], ',') + '{' + serialize(node[2]) + '}')
+        else:
+            out.append(squeeze(node[1], ',>') + '{' + minify_declarations(node[2]) + '}')
+    return ''.join(out)
+
+
+# ==============================
+# URL REWRITING
+# ==============================
+URL_PATTERN = re.compile(r'url\(\s*(["\']?)([^"\')]+)\1\s*\)')
+
+
+def rewrite_urls(css, source, out_dir):
+    """Make relative url()s in source point at the same files from out_dir."""
+    source_dir = os.path.dirname(source)
+
+    def replace(match):
+        quote, url = match.groups()
+        if re.match(r'^(data:|[a-z]+:|/|#)', url):
+            return match.group(0)
+        path, sep, query = url.partition('?')
+        target = os.path.normpath(os.path.join(source_dir, path))
+        new_url = os.path.relpath(target, out_dir).replace(os.sep, '/') + sep + query
+        return f'url({quote}{new_url}{quote})'
+
+    return URL_PATTERN.sub(replace, css)
+
+
+# ==============================
+# PURGE
+# ==============================
+def used_tokens(paths):
+    """Every word-like token in the given files, a superset of used classes."""
+    tokens = set()
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            tokens.update(re.findall(r'[A-Za-z0-9_-]+', f.read()))
+    return tokens
+
+
+def selector_classes(selector):
+    # Classes inside :not(...) do not need to be present for a match
+    selector = re.sub(r':not\([^)]*\)', '', selector)
+    return re.findall(r'\.(-?[_a-zA-Z][\w-]*)', selector)
+
+
+def purge(nodes, used):
+    """Drop selectors whose classes are not all in used; return (nodes, removed)."""
+    kept, removed = [], 0
+    for node in nodes:
+        if node[0] == 'block':
+            children, count = purge(node[2], used)
+            removed += count
+            if children or not node[1].startswith('@media'):
+                kept.append((node[0], node[1], children))
+        elif node[0] == 'rule' and not node[1].startswith('@'):
+            if '\\' in node[1]:
+                kept.append(node)
+                continue
+            selectors = [s for s in split_outside(node[1], ',')
+                         if all(c in used for c in selector_classes(s))]
+            if selectors:
+                kept.append(('rule', ','.join(selectors), node[2]))
+            else:
+                removed += 1
+        else:
+            kept.append(node)
+    return kept, removed
+
+
+# ==============================
+# BUILD
+# ==============================
+def minify_js(js):
+    """
+    Conservative: drop comment-only lines, indentation and blank lines.
+    Already minified files are left as they are.
+    """
+    lines = []
+    in_comment = False
+    for line in js.splitlines():
+        stripped = line.strip()
+        if in_comment:
+            in_comment = '*/' not in stripped
+            continue
+        if stripped.startswith('/*') and not stripped.startswith('/*!'):
+            in_comment = '*/' not in stripped
+            continue
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines)
+
+
+def build_css(static_dir, out_dir, used=None):
+    parts, removed = [], 0
+    for name in CSS_FILES:
+        path = os.path.join(static_dir, name)
+        with open(path, encoding='utf-8') as f:
+            css = strip_comments(f.read())
+        css = rewrite_urls(css, path, out_dir)
+        nodes, _ = parse_css(css)
+        nodes = [n for n in nodes if not (n[0] == 'at' and n[1].lower().startswith('@charset'))]
+        if used is not None and name.startswith(PURGE_FILES):
+            nodes, count = purge(nodes, used)
+            removed += count
+        parts.append(serialize(nodes))
+    return '@charset "UTF-8";\n' + '\n'.join(parts) + '\n', removed
+
+
+def build_js(static_dir):
+    parts = []
+    for name in JS_FILES:
+        with open(os.path.join(static_dir, name), encoding='utf-8') as f:
+            js = f.read()
+        parts.append(js.strip() if '.min.' in name else minify_js(js))
+    return ';\n'.join(parts) + ';\n'
+
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(text)
+    return len(text.encode('utf-8'))
+
+
+def source_files(static_dir):
+    scan = []
+    for directory in Config.TEMPLATE_DIRS:
+        scan.extend(glob.glob(os.path.join(directory, '*.html')))
+    scan.extend(glob.glob(os.path.join(os.path.dirname(__file__), '*.py')))
+    scan.extend(os.path.join(static_dir, name) for name in JS_FILES)
+    return scan
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Bundle and minify the static CSS/JS.')
+    parser.add_argument('--static', default=Config.STATIC_DIR, help='static directory')
+    parser.add_argument('--purge', action='store_true', help='drop vendor CSS rules for unused classes')
+    parser.add_argument('--keep', action='append', default=[], help='class to keep when purging (repeatable)')
+    parser.add_argument('--highlight-style', dest='highlight_style', default=Config.HIGHLIGHT_STYLE,
+                        help='Pygments style for css/highlight.css')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out_dir = os.path.join(args.static, BUNDLE_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+
+    if highlight is None:
+        print(f"Pygments not installed: {HIGHLIGHT_CSS} left as it is")
+    elif write_stylesheet(args.static, args.highlight_style):
+        print(f"{HIGHLIGHT_CSS} written for the Pygments '{args.highlight_style}' style")
+
+    inputs = [os.path.join(args.static, name) for name in CSS_FILES + JS_FILES]
+    used = None
+    if args.purge:
+        scanned = source_files(args.static)
+        used = used_tokens(scanned) | set(args.keep)
+        inputs.extend(scanned)
+    css, removed = build_css(args.static, out_dir, used)
+    js = build_js(args.static)
+
+    css_before = sum(os.path.getsize(os.path.join(args.static, n)) for n in CSS_FILES)
+    js_before = sum(os.path.getsize(os.path.join(args.static, n)) for n in JS_FILES)
+    css_after = write(os.path.join(out_dir, 'bundle.css'), css)
+    js_after = write(os.path.join(out_dir, 'bundle.js'), js)
+    # Lets the app notice (library/assets.py) when an input changed after this build
+    digests = {os.path.relpath(path, args.static).replace(os.sep, '/'): file_digest(path)
+               for path in dict.fromkeys(inputs)}
+    write(os.path.join(out_dir, BUNDLE_MANIFEST), json.dumps({'inputs': digests}, indent=2) + '\n')
+    print(f"bundle.css  {len(CSS_FILES)} files  {css_before:>8} -> {css_after:>8} bytes"
+          + (f"  ({removed} rules purged)" if args.purge else ''))
+    print(f"bundle.js   {len(JS_FILES)} files  {js_before:>8} -> {js_after:>8} bytes")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+# ==============================
+# library/catalog.py - Scan of the books folder
+# ==============================
+# The sitemap, search index and prewarm all need the list of books and
+# chapters. The catalog walks BOOKS_DIR once and keeps the result until
+# CATALOG_TTL runs out; a rescan builds a new snapshot and swaps it in, so
+# readers never see a half-built catalog.
+#
+# Everything is in natural order (chapter-2 before chapter-10, README
+# first in its folder) unless front matter gives an order, and each
+# snapshot carries the reading order of every book: prev/next and
+# breadcrumbs per page, looked up in O(1). Titles, summaries and tags come
+# from the front matter (library/metadata.py) where there is one.
+import os
+import re
+import time
+import threading
+from flask import g, has_request_context
+
+from .metadata import MetadataIndex, tag_key
+
+NUMBERS = re.compile(r'(\d+)')
+
+
+def title_from_name(name):
+    return name.replace('.md', '').replace('-', ' ').title()
+
+
+def natural_key(name):
+    """Sort key treating digit runs as numbers: chapter-2 < chapter-10."""
+    return [int(part) if part.isdigit() else part.lower() for part in NUMBERS.split(name)]
+
+
+def node_meta(meta, url_path):
+    """Front matter of a chapter, or of a folder's README."""
+    return meta.get(url_path) or meta.get(url_path + '/README') or {}
+
+
+def path_key(url_path, meta=None):
+    """
+    README first in its folder, then pages and folders with an order in
+    that order, then the rest in natural order.
+    """
+    parts = url_path.split('/')
+    key = []
+    for i, part in enumerate(parts):
+        if part.lower() == 'readme':
+            key.append((0,))
+            continue
+        order = node_meta(meta or {}, '/'.join(parts[:i + 1])).get('order')
+        key.append((1, 0, order, natural_key(part)) if order is not None else (1, 1, 0, natural_key(part)))
+    return key
+
+
+def page_title(url_path, meta=None):
+    parts = url_path.split('/')
+    if parts[-1].lower() == 'readme' and len(parts) > 1:
+        parts = parts[:-1]
+    return node_meta(meta or {}, '/'.join(parts)).get('title') or title_from_name(parts[-1])
+
+
+def build_navigation(files, meta=None):
+    """
+    {url_path: {'prev', 'next', 'crumbs'}} for every page. Chapters of a
+    book form one reading sequence across its volumes; a folder README
+    points to the first chapter below it. Links are (title, url_path).
+    """
+    navigation = {}
+    books = {}
+    for url_path, _ in files:
+        books.setdefault(url_path.split('/')[0], []).append(url_path)
+
+    for pages in books.values():
+        chapters = [p for p in pages if os.path.basename(p).lower() != 'readme']
+        index = {p: i for i, p in enumerate(chapters)}
+        for url_path in pages:
+            parts = url_path.split('/')
+            folders = parts[:-1]
+            crumbs = [(page_title('/'.join(folders[:i + 1]), meta), '/'.join(folders[:i + 1]))
+                      for i in range(len(folders))]
+            prev = next_ = None
+            if url_path in index:
+                i = index[url_path]
+                prev = chapters[i - 1] if i > 0 else None
+                next_ = chapters[i + 1] if i + 1 < len(chapters) else None
+            else:
+                crumbs = crumbs[:-1]  # a README's last crumb is the page itself
+                folder = '/'.join(parts[:-1]) + '/'
+                next_ = next((c for c in chapters if c.startswith(folder)), None)
+            navigation[url_path] = {
+                'prev': (page_title(prev, meta), prev) if prev else None,
+                'next': (page_title(next_, meta), next_) if next_ else None,
+                'crumbs': crumbs,
+            }
+    return navigation
+
+
+def build_tags(files, meta):
+    """{tag key: {'name', 'pages': [{'title', 'path', 'summary', 'date'}]}} in reading order."""
+    tags = {}
+    for url_path, _ in files:
+        page = meta.get(url_path, {})
+        for name in page.get('tags', ()):
+            entry = tags.setdefault(tag_key(name), {'name': name, 'pages': []})
+            path = url_path[:-len('/README')] if url_path.endswith('/README') else url_path
+            entry['pages'].append({'title': page_title(url_path, meta), 'path': path,
+                                   'summary': page.get('summary'), 'date': page.get('date')})
+    return dict(sorted(tags.items(), key=lambda item: natural_key(item[0])))
+
+
+class Snapshot:
+    """One complete scan of the books folder."""
+
+    def __init__(self, books, files, version, meta=None):
+        self.books = books      # {'Book Title': [{'title', 'path', 'summary'}, ...]}
+        self.files = files      # [(url_path, full_path), ...] of every .md file
+        self.version = version
+        self.meta = meta or {}  # {url_path: front matter}
+        self.navigation = build_navigation(files, self.meta)
+        self.tags = build_tags(files, self.meta)
+
+    def lookup(self, md_path):
+        """url_path of the page behind a /books/<md_path> URL, or None."""
+        url_path = md_path[:-3] if md_path.endswith('.md') else md_path.rstrip('/')
+        for candidate in (url_path, url_path + '/README'):
+            if candidate in self.navigation:
+                return candidate
+        return None
+
+    def page_navigation(self, md_path):
+        """Navigation for a /books/<md_path> URL (chapter or folder), or None."""
+        url_path = self.lookup(md_path)
+        return self.navigation[url_path] if url_path else None
+
+    def page_meta(self, md_path):
+        url_path = self.lookup(md_path)
+        return self.meta.get(url_path, {}) if url_path else {}
+
+    def title(self, url_path):
+        return page_title(url_path, self.meta)
+
+    def sort_key(self, url_path):
+        return path_key(url_path, self.meta)
+
+
+class Catalog:
+    def __init__(self, books_dir, ttl=0):
+        self.books_dir = books_dir
+        self.ttl = ttl
+        self.metadata = MetadataIndex()
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.refreshing = False
+
+    # ------------------------------
+    # Public access
+    # ------------------------------
+    def snapshot(self):
+        """
+        The current snapshot, rescanned once CATALOG_TTL has run out. Within
+        a request the first answer is kept on g, so a page that consults the
+        catalog several times (nav, metadata, listings) scans at most once.
+        """
+        if not has_request_context():
+            return self._current()
+        snap = g.get('catalog_snapshot')
+        if snap is None:
+            snap = g.catalog_snapshot = self._current()
+        return snap
+
+    def _current(self):
+        snap = self._snapshot
+        if snap is None or self._expired():
+            snap = self.refresh(stale=snap)
+        return snap
+
+    def peek(self):
+        """The current snapshot (or None) without triggering a rescan."""
+        return self._snapshot
+
+    def refresh(self, stale=False):
+        """
+        Rescan now. stale is the snapshot (or None) a caller found expired:
+        threads that queued on the lock behind another rescan take its
+        result instead of scanning again.
+        """
+        with self._lock:
+            if stale is not False and self._snapshot is not stale:
+                return self._snapshot
+            self.refreshing = True
+            try:
+                version = self._snapshot.version + 1 if self._snapshot else 1
+                files = self._scan_files()
+                meta = self.metadata.build(files)
+                files.sort(key=lambda f: path_key(f[0], meta))
+                snap = Snapshot(self._scan_books(meta), files, version, meta)
+                self._snapshot = snap
+                self._loaded_at = time.monotonic()
+            finally:
+                self.refreshing = False
+        return snap
+
+    def _expired(self):
+        if self.ttl is None:
+            return False
+        return time.monotonic() - self._loaded_at >= self.ttl
+
+    # ------------------------------
+    # Scanning
+    # ------------------------------
+    def _scan_books(self, meta):
+        books = {}
+        for book_folder in sorted(os.listdir(self.books_dir), key=lambda name: path_key(name, meta)):
+            book_path = os.path.join(self.books_dir, book_folder)
+            if os.path.isdir(book_path):
+                chapters = []
+                for item in os.listdir(book_path):
+                    item_path = os.path.join(book_path, item)
+                    if os.path.isdir(item_path):
+                        path = f"{book_folder}/{item}"
+                    elif item.endswith('.md') and item.lower() != 'readme.md':
+                        path = f"{book_folder}/{item.replace('.md', '')}"
+                    else:
+                        continue
+                    chapters.append({'title': page_title(path, meta), 'path': path,
+                                     'summary': node_meta(meta, path).get('summary')})
+                chapters.sort(key=lambda c: path_key(c['path'], meta))
+                books[page_title(book_folder, meta)] = chapters
+        return books
+
+    def _scan_files(self):
+        files = []
+        for root, dirs, names in os.walk(self.books_dir):
+            for name in names:
+                if name.endswith('.md'):
+                    full_path = os.path.join(root, name)
+                    rel_path = os.path.relpath(full_path, self.books_dir)
+                    files.append((rel_path.replace('\\', '/').replace('.md', ''), full_path))
+        return files
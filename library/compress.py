@@ -0,0 +1,54 @@
+# ==============================
+# library/compress.py - gzip for text responses
+# ==============================
+# Static files are streamed (direct_passthrough) and left alone; only
+# rendered pages are compressed, and only when they are big enough for
+# gzip to pay off. Streamed pages (?all=1 volumes) are compressed chunk by
+# chunk, flushing after each so the browser can render as they arrive.
+import gzip
+import zlib
+from flask import request
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml')
+
+
+def gzip_stream(body, charset, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+    try:
+        for chunk in body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+
+
+def init_compression(app):
+    level = app.config['COMPRESS_LEVEL']
+    min_size = app.config['COMPRESS_MIN_SIZE']
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough
+                or response.status_code != 200
+                or 'Content-Encoding' in response.headers
+                or not response.mimetype.startswith(COMPRESSIBLE_TYPES)
+                or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()):
+            return response
+        if response.is_streamed:
+            response.response = gzip_stream(response.response, response.mimetype_params.get('charset', 'utf-8'), level)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = 'gzip'
+            response.vary.add('Accept-Encoding')
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(gzip.compress(data, compresslevel=level))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,160 @@
+# ==============================
+# library/config.py - Settings and performance profiles
+# ==============================
+# Every deployment picks one profile (LIBRARY_PROFILE=dev|production) and
+# can override single values with a settings file pointed to by
+# LIBRARY_SETTINGS, e.g.
+#
+#   # /etc/flaskapp/settings.py
+#   PASSWORD = 'secret'
+#   RENDER_CACHE_SIZE = 2048
+import os
+
+# ------------------------------
+# Compute absolute paths
+# ------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILE_ENV = 'LIBRARY_PROFILE'
+SETTINGS_ENV = 'LIBRARY_SETTINGS'
+DEFAULT_PROFILE = 'production'
+# WSGI environ key set on prewarm requests (kept out of logs and metrics)
+PREWARM_ENVIRON = 'library.prewarm'
+
+
+# ==============================
+# BASE SETTINGS
+# ==============================
+class Config:
+    BASE_DIR = BASE_DIR
+    BOOKS_DIR = os.path.join(BASE_DIR, 'books')
+    TEMPLATE_DIRS = [
+        os.path.join(BASE_DIR, 'app'),
+        os.path.join(BASE_DIR, 'templates')
+    ]
+    STATIC_DIR = os.path.join(BASE_DIR, 'static')
+
+    # Login
+    PASSWORD_ENABLED = True
+    PASSWORD = 'q'  # Your site password
+
+    # Rendered markdown kept in memory (number of pages, 0 = no cache)
+    RENDER_CACHE_SIZE = 0
+    # base.html rendered around a placeholder, per (login state, title)
+    LAYOUT_CACHE_SIZE = 0
+    # Chapters with at least this many headings show a table of contents
+    TOC_MIN_HEADINGS = 3
+
+    # Seconds before the book catalog is rescanned (0 = every request,
+    # None = never, only on prewarm/restart). A few seconds is enough for
+    # new or renamed chapters to show up while writing; a rescan walks the
+    # whole tree and parses front matter, far too slow for every request.
+    CATALOG_TTL = 2
+
+    # 'scan' reads every file per query, 'index' keeps contents in memory
+    SEARCH_BACKEND = 'scan'
+
+    # gzip text responses for clients that accept it
+    COMPRESS = False
+    COMPRESS_LEVEL = 6
+    COMPRESS_MIN_SIZE = 500
+
+    # Build catalog/index and render every page when the app is created
+    PREWARM = False
+
+    # Server-Timing header and Prometheus metrics on /metrics
+    INSTRUMENTATION = False
+    # Bearer token for scrapers; without one /metrics needs the login cookie
+    METRICS_TOKEN = None
+
+    # JSON-lines access log written by a background thread ('-' = stdout)
+    ACCESS_LOG = False
+    ACCESS_LOG_FILE = os.path.join(BASE_DIR, 'var', 'access.jsonl')
+    ACCESS_LOG_QUEUE = 10000       # records buffered before dropping
+    ACCESS_LOG_BATCH = 200         # records per write
+    ACCESS_LOG_FLUSH_INTERVAL = 1.0
+
+    # Fraction of requests traced per stage (0 = off), see library/tracing.py
+    TRACE_SAMPLE_RATE = 0.0
+    TRACE_FILE = os.path.join(BASE_DIR, 'var', 'traces.jsonl')
+
+    # Secret for admin diagnostics (None = disabled), see library/admin.py
+    ADMIN_SECRET = None
+    # Seconds a browser's admin cookie stays valid after ?secret=
+    ADMIN_TOKEN_MAX_AGE = 1800
+
+    # ?_profile=<ADMIN_SECRET> profiling, see library/profiler.py
+    PROFILE_DIR = os.path.join(BASE_DIR, 'var', 'profiles')
+    PROFILE_SAMPLE_INTERVAL = 0.001  # seconds between stack samples
+
+    # /_diagnostics memory pages, see library/diagnostics.py
+    DIAGNOSTICS_TOP = 25
+    TRACEMALLOC_FRAMES = 0  # > 0 starts tracemalloc at startup
+
+    # Content-hashed static URLs with immutable caching, see library/assets.py
+    STATIC_FINGERPRINT = False
+    # Link static/dist/bundle.css/.js when built (python -m library.bundle)
+    ASSET_BUNDLE = False
+    # Link static/fonts/fonts.css when built (python -m library.fonts)
+    SELF_HOSTED_FONTS = False
+
+    # Resized AVIF/WebP/PNG images and srcsets (needs Pillow), see library/images.py
+    IMAGES = False
+    IMAGE_WIDTHS = [320, 640, 960, 1440]
+    IMAGE_FORMATS = ['avif', 'webp']   # offered before the PNG/JPEG fallback
+    IMAGE_QUALITY = 70
+    IMAGE_SIZES = '(max-width: 960px) 100vw, 960px'
+    IMAGE_CACHE_DIR = os.path.join(BASE_DIR, 'var', 'images')
+
+    # Pygments highlighting of ```lang fences (needs Pygments), see library/highlight.py
+    HIGHLIGHT = False
+    HIGHLIGHT_STYLE = 'default'
+    # Lexer for fences without a language (None = leave them plain), e.g. 'text'
+    HIGHLIGHT_DEFAULT_LANGUAGE = None
+    # Highlighted code blocks kept in memory, keyed by (language, code hash)
+    HIGHLIGHT_CACHE_SIZE = 512
+
+    # Strip whitespace/comments from templates and cached chapters, see library/minify.py
+    HTML_MINIFY = False
+
+    # Finished /books/<book>/export.epub|.zip archives, see library/export.py
+    EXPORT_CACHE_DIR = os.path.join(BASE_DIR, 'var', 'exports')
+
+    # Concurrent requests per endpoint ({} = no limits), see library/admission.py
+    ADMISSION_LIMITS = {}
+    ADMISSION_QUEUE = 8          # requests allowed to wait for a slot
+    ADMISSION_WAIT = 0.5         # seconds a request waits before 503
+    ADMISSION_RETRY_AFTER = 2    # Retry-After header, seconds
+
+
+# ==============================
+# PROFILES
+# ==============================
+class DevConfig(Config):
+    DEBUG = True
+    TEMPLATES_AUTO_RELOAD = True
+
+
+class ProductionConfig(Config):
+    RENDER_CACHE_SIZE = 1024
+    LAYOUT_CACHE_SIZE = 2048
+    CATALOG_TTL = 300
+    SEARCH_BACKEND = 'index'
+    COMPRESS = True
+    PREWARM = True
+    INSTRUMENTATION = True
+    ACCESS_LOG = True
+    TRACE_SAMPLE_RATE = 0.01
+    ADMISSION_LIMITS = {'search': 2, 'sitemap': 2, 'render_md': 3, 'image': 2, 'export_book': 2}
+    STATIC_FINGERPRINT = True
+    ASSET_BUNDLE = True
+    SELF_HOSTED_FONTS = True
+    IMAGES = True
+    HIGHLIGHT = True
+    HTML_MINIFY = True
+
+
+PROFILES = {
+    'dev': DevConfig,
+    'production': ProductionConfig,
+}
@@ -0,0 +1,230 @@
+# ==============================
+# library/diagnostics.py - Memory diagnostics for a long-running process
+# ==============================
+# Admin-only pages (see library/admin.py; links and redirects rely on the
+# admin cookie or header, never on ?secret=):
+#
+#   /_diagnostics                    RSS, GC counts, objects by type, cache
+#                                    sizes and top tracemalloc sites
+#   /_diagnostics/snapshot  (POST)   store a tracemalloc snapshot
+#   /_diagnostics/diff?a=1&b=2       compare two stored snapshots
+#
+# tracemalloc costs memory and CPU, so it only runs when TRACEMALLOC_FRAMES
+# is set, or after POST /_diagnostics/tracemalloc.
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from flask import render_template_string, request, redirect, url_for, abort
+
+from .admin import require_admin
+
+MAX_SNAPSHOTS = 5
+
+DIAGNOSTICS_TEMPLATE = """
+{% extends "base.html" %}
+{% block content %}
+<h2 class="title">Diagnostics</h2>
+<div class="content">
+  <h4>Process</h4>
+  <table class="table">
+    <tr><td>PID</td><td>{{ pid }}</td></tr>
+    <tr><td>RSS</td><td>{{ rss }}</td></tr>
+    <tr><td>Peak RSS</td><td>{{ peak_rss }}</td></tr>
+    <tr><td>GC counts (gen 0/1/2)</td><td>{{ gc_counts }}</td></tr>
+    <tr><td>GC collections (gen 0/1/2)</td><td>{{ gc_collections }}</td></tr>
+    <tr><td>Tracked objects</td><td>{{ object_total }}</td></tr>
+  </table>
+
+  <h4>Caches</h4>
+  <table class="table">
+    <tr><th>Cache</th><th>Entries</th><th>Size</th></tr>
+    {% for c in caches %}
+      <tr><td>{{ c.name }}</td><td>{{ c.entries }}</td><td>{{ c.size }}</td></tr>
+    {% endfor %}
+  </table>
+
+  <h4>Objects by type (top {{ top }})</h4>
+  <table class="table">
+    {% for name, count in object_counts %}
+      <tr><td>{{ name }}</td><td>{{ count }}</td></tr>
+    {% endfor %}
+  </table>
+
+  <h4>tracemalloc</h4>
+  {% if not tracing %}
+    <p>Not running.</p>
+    <form method="post" action="{{ url_for('diagnostics_tracemalloc') }}"><button type="submit">Start tracemalloc</button></form>
+  {% else %}
+    <p>Traced: {{ traced_current }} now, {{ traced_peak }} peak.</p>
+    <table class="table">
+      {% for stat in top_stats %}
+        <tr><td><code>{{ stat.traceback }}</code></td><td>{{ stat.size }}</td><td>{{ stat.count }} blocks</td></tr>
+      {% endfor %}
+    </table>
+    <form method="post" action="{{ url_for('diagnostics_snapshot') }}"><button type="submit">Take snapshot</button></form>
+    {% if snapshots %}
+      <p>Snapshots:
+      {% for id, taken in snapshots %}#{{ id }} ({{ taken }}){% if not loop.last %}, {% endif %}{% endfor %}</p>
+      {% if snapshots|length > 1 %}
+        <p><a href="{{ url_for('diagnostics_diff', a=snapshots[-2][0], b=snapshots[-1][0]) }}">Diff last two</a></p>
+      {% endif %}
+    {% endif %}
+  {% endif %}
+</div>
+{% endblock %}
+"""
+
+DIFF_TEMPLATE = """
+{% extends "base.html" %}
+{% block content %}
+<h2 class="title">Snapshot #{{ a }} &rarr; #{{ b }}</h2>
+<div class="content">
+  <table class="table">
+    <tr><th>Site</th><th>Size change</th><th>Size</th><th>Blocks change</th></tr>
+    {% for stat in stats %}
+      <tr><td><code>{{ stat.traceback }}</code></td><td>{{ stat.size_diff }}</td><td>{{ stat.size }}</td><td>{{ stat.count_diff }}</td></tr>
+    {% endfor %}
+  </table>
+</div>
+{% endblock %}
+"""
+
+
+def format_bytes(n):
+    if n is None:
+        return 'n/a'
+    value = float(n)
+    for unit in ('B', 'KB', 'MB'):
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+def process_rss():
+    """Current and peak RSS in bytes (Linux /proc, else peak only)."""
+    current = peak = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    current = int(line.split()[1]) * 1024
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) * 1024
+    except OSError:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            if sys.platform != 'darwin':
+                peak *= 1024
+        except ImportError:
+            pass
+    return current, peak
+
+
+def object_counts(top):
+    counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    return sum(counts.values()), counts.most_common(top)
+
+
+def cache_usage(app, state):
+    """Entries and approximate bytes of every cache the app keeps."""
+    search_stats = state.search.stats()
+    snap = state.catalog.peek()
+    jinja_cache = app.jinja_env.cache
+    return [
+        {'name': 'render', 'entries': len(state.render_cache), 'size': format_bytes(state.render_cache.nbytes)},
+        {'name': 'layout', 'entries': len(state.layout_cache), 'size': format_bytes(state.layout_cache.nbytes)},
+        {'name': 'highlight', 'entries': len(state.highlighter.cache) if state.highlighter else 0,
+         'size': format_bytes(state.highlighter.cache.nbytes) if state.highlighter else 'n/a'},
+        {'name': 'search index', 'entries': search_stats['documents'], 'size': format_bytes(search_stats['bytes'])},
+        {'name': 'catalog', 'entries': len(snap.files) if snap else 0, 'size': 'n/a'},
+        {'name': 'jinja templates', 'entries': len(jinja_cache) if jinja_cache is not None else 0, 'size': 'n/a'},
+    ]
+
+
+def format_stat(stat, diff=False):
+    frame = stat.traceback[0]
+    filename = frame.filename
+    if not filename.startswith('<'):
+        filename = os.path.relpath(filename)
+    row = {
+        'traceback': f"{filename}:{frame.lineno}",
+        'size': format_bytes(stat.size),
+        'count': stat.count,
+    }
+    if diff:
+        row['size_diff'] = format_bytes(stat.size_diff)
+        row['count_diff'] = stat.count_diff
+    return row
+
+
+# ==============================
+# ROUTES
+# ==============================
+def init_diagnostics(app, state):
+    snapshots = OrderedDict()  # id -> (time, snapshot)
+    top = app.config['DIAGNOSTICS_TOP']
+    state.public_endpoints.update({'diagnostics', 'diagnostics_tracemalloc',
+                                   'diagnostics_snapshot', 'diagnostics_diff'})
+
+    if app.config['TRACEMALLOC_FRAMES'] and not tracemalloc.is_tracing():
+        tracemalloc.start(app.config['TRACEMALLOC_FRAMES'])
+
+    @app.route('/_diagnostics')
+    def diagnostics():
+        require_admin()
+        rss, peak = process_rss()
+        total, counts = object_counts(top)
+        context = dict(
+            pid=os.getpid(),
+            rss=format_bytes(rss),
+            peak_rss=format_bytes(peak),
+            gc_counts=gc.get_count(),
+            gc_collections=tuple(s['collections'] for s in gc.get_stats()),
+            object_total=total,
+            object_counts=counts,
+            caches=cache_usage(app, state),
+            tracing=tracemalloc.is_tracing(),
+            snapshots=[(i, time.strftime('%H:%M:%S', time.localtime(t))) for i, (t, _) in snapshots.items()],
+            top=top,
+        )
+        if context['tracing']:
+            current, peak_traced = tracemalloc.get_traced_memory()
+            context['traced_current'] = format_bytes(current)
+            context['traced_peak'] = format_bytes(peak_traced)
+            stats = tracemalloc.take_snapshot().statistics('lineno')[:top]
+            context['top_stats'] = [format_stat(s) for s in stats]
+        return render_template_string(DIAGNOSTICS_TEMPLATE, title="Diagnostics", **context)
+
+    @app.route('/_diagnostics/tracemalloc', methods=['POST'])
+    def diagnostics_tracemalloc():
+        require_admin()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(app.config['TRACEMALLOC_FRAMES'] or 1)
+        return redirect(url_for('diagnostics'))
+
+    @app.route('/_diagnostics/snapshot', methods=['POST'])
+    def diagnostics_snapshot():
+        require_admin()
+        if not tracemalloc.is_tracing():
+            abort(409)
+        snapshot_id = (max(snapshots) + 1) if snapshots else 1
+        snapshots[snapshot_id] = (time.time(), tracemalloc.take_snapshot())
+        while len(snapshots) > MAX_SNAPSHOTS:
+            snapshots.popitem(last=False)
+        return redirect(url_for('diagnostics'))
+
+    @app.route('/_diagnostics/diff')
+    def diagnostics_diff():
+        require_admin()
+        a = request.args.get('a', type=int)
+        b = request.args.get('b', type=int)
+        if a not in snapshots or b not in snapshots:
+            abort(404)
+        stats = snapshots[b][1].compare_to(snapshots[a][1], 'lineno')[:top]
+        return render_template_string(DIFF_TEMPLATE, title="Snapshot Diff", a=a, b=b,
+                                      stats=[format_stat(s, diff=True) for s in stats])
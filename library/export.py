@@ -0,0 +1,211 @@
+# ==============================
+# library/export.py - Whole-book EPUB / ZIP downloads
+# ==============================
+#   /books/<book>/export.epub   every chapter as XHTML in an EPUB 3
+#   /books/<book>/export.zip    the book's markdown files as they are
+#
+# The first download streams the archive entry by entry while it is
+# being written to EXPORT_CACHE_DIR, so neither the server nor the reader
+# waits for (or holds) the whole file. The finished archive is named after
+# a hash of the book's files; later downloads send it straight from disk
+# (with Range support) until a chapter changes.
+import os
+import re
+import glob
+import hashlib
+import zipfile
+import threading
+from datetime import datetime, timezone
+from flask import Response, abort, send_file, stream_with_context
+from markupsafe import escape
+
+from .catalog import title_from_name
+from .render import file_stamp, render_markdown
+
+MIMETYPES = {'epub': 'application/epub+zip', 'zip': 'application/zip'}
+
+CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+CHAPTER_XHTML = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">
+<head><meta charset="utf-8"/><title>{title}</title></head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+# ==============================
+# BOOK CONTENTS
+# ==============================
+class FileDigests:
+    """sha256 of files, recomputed only when their (mtime, size) changes."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        stamp = file_stamp(path)
+        entry = self._data.get(path)
+        if entry is None or entry[0] != stamp:
+            h = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(65536), b''):
+                    h.update(block)
+            entry = (stamp, h.hexdigest())
+            with self._lock:
+                self._data[path] = entry
+        return entry[1]
+
+
+def chapter_title(url_path, book):
+    parts = url_path.split('/')[1:]
+    if parts and parts[-1].lower() == 'readme':
+        parts = parts[:-1]
+    return ' / '.join(title_from_name(p) for p in parts) or title_from_name(book)
+
+
+# ==============================
+# ARCHIVE ENTRIES
+# ==============================
+def zip_entries(book, files):
+    for url_path, full_path in files:
+        with open(full_path, 'rb') as f:
+            yield url_path + '.md', f.read(), zipfile.ZIP_DEFLATED
+
+
+def epub_entries(book, files, digest, modified):
+    chapters = [(f"c{i:04d}.xhtml", chapter_title(url_path, book), url_path, full_path)
+                for i, (url_path, full_path) in enumerate(files, 1)]
+    title = escape(title_from_name(book))
+
+    yield 'mimetype', b'application/epub+zip', zipfile.ZIP_STORED
+    yield 'META-INF/container.xml', CONTAINER_XML.encode(), zipfile.ZIP_DEFLATED
+
+    manifest = '\n'.join(f'    <item id="c{i}" href="{name}" media-type="application/xhtml+xml"/>'
+                         for i, (name, _, _, _) in enumerate(chapters, 1))
+    spine = '\n'.join(f'    <itemref idref="c{i}"/>' for i in range(1, len(chapters) + 1))
+    opf = f"""<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="book-id">urn:library:{escape(book)}:{digest[:16]}</dc:identifier>
+    <dc:title>{title}</dc:title>
+    <dc:language>en</dc:language>
+    <meta property="dcterms:modified">{modified}</meta>
+  </metadata>
+  <manifest>
+    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+{manifest}
+  </manifest>
+  <spine>
+{spine}
+  </spine>
+</package>
+"""
+    yield 'OEBPS/content.opf', opf.encode(), zipfile.ZIP_DEFLATED
+
+    toc = '\n'.join(f'<li><a href="{name}">{escape(chapter)}</a></li>' for name, chapter, _, _ in chapters)
+    nav = CHAPTER_XHTML.format(title=title, body=f'<nav epub:type="toc"><h1>{title}</h1><ol>\n{toc}\n</ol></nav>')
+    yield 'OEBPS/nav.xhtml', nav.encode(), zipfile.ZIP_DEFLATED
+
+    for name, chapter, url_path, full_path in chapters:
+        body = render_markdown(full_path, url_path).html
+        yield f'OEBPS/{name}', CHAPTER_XHTML.format(title=escape(chapter), body=body).encode(), zipfile.ZIP_DEFLATED
+
+
+# ==============================
+# STREAMING WRITER
+# ==============================
+def stream_archive(entries, target, on_done=None):
+    """
+    Write entries into a zip at target and yield its bytes as each entry
+    is finished. The zip is written to a real (seekable) file so headers
+    are complete; only bytes zipfile will not touch again are sent.
+    on_done() runs once the archive is in place.
+    """
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, 'w+b') as f:
+            sent = 0
+
+            def written():
+                nonlocal sent
+                f.flush()
+                end = f.tell()
+                f.seek(sent)
+                data = f.read(end - sent)
+                sent = end
+                return data
+
+            with zipfile.ZipFile(f, 'w') as zf:
+                for name, data, compress_type in entries:
+                    zf.writestr(zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0)), data,
+                                compress_type=compress_type)
+                    yield written()
+            yield written()  # central directory
+        os.replace(tmp, target)
+        if on_done:
+            on_done()
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def remove_stale(cache_dir, book, fmt, keep):
+    """Delete earlier archives of the same book and format."""
+    pattern = re.compile(re.escape(book) + r'-[0-9a-f]{16}\.' + fmt)
+    for path in glob.glob(os.path.join(cache_dir, f"{glob.escape(book)}-*.{fmt}")):
+        if path != keep and pattern.fullmatch(os.path.basename(path)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# ==============================
+# ROUTE
+# ==============================
+def init_export(app, state):
+    cache_dir = app.config['EXPORT_CACHE_DIR']
+    digests = FileDigests()
+
+    @app.route('/books/<book>/export.<fmt>')
+    def export_book(book, fmt):
+        if fmt not in MIMETYPES:
+            abort(404)
+        prefix = book + '/'
+        files = [(u, p) for u, p in state.catalog.snapshot().files if u.startswith(prefix)]
+        if not files:
+            abort(404)
+
+        h = hashlib.sha256(fmt.encode())
+        for url_path, full_path in files:
+            h.update(f"{url_path}\0{digests.get(full_path)}\0".encode())
+        digest = h.hexdigest()
+        target = os.path.join(cache_dir, f"{book}-{digest[:16]}.{fmt}")
+        download_name = f"{book}.{fmt}"
+
+        if os.path.exists(target):
+            return send_file(target, mimetype=MIMETYPES[fmt], as_attachment=True,
+                             download_name=download_name, conditional=True)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        if fmt == 'epub':
+            newest = max(os.path.getmtime(p) for _, p in files)
+            modified = datetime.fromtimestamp(newest, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            entries = epub_entries(book, files, digest, modified)
+        else:
+            entries = zip_entries(book, files)
+        stream = stream_archive(entries, target, lambda: remove_stale(cache_dir, book, fmt, target))
+        response = Response(stream_with_context(stream), mimetype=MIMETYPES[fmt])
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+        return response
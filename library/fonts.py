@@ -0,0 +1,250 @@
+# ==============================
+# library/fonts.py - Vendor the web fonts into static/fonts
+# ==============================
+# Usage:
+#   python -m library.fonts                  # download, subset, write CSS
+#   python -m library.fonts --no-subset      # keep the files as served
+#
+# Fetches the Google Fonts stylesheets base.html used to link (Special
+# Elite, Poppins, IM Fell English) and downloads every woff2 face into
+# static/fonts/, named <family>-<weight>-<style>-<subset>.<hash>.woff2 so
+# they are served as immutable (library/assets.py). Faces whose
+# unicode-range covers none of the characters in the templates and books
+# are skipped; with fontTools (and brotli) installed the rest are also
+# subset to those characters. Writes:
+#
+#   static/fonts/fonts.css    @font-face rules with font-display: swap
+#   static/fonts/fonts.json   file list and the faces to <link rel=preload>
+#
+# With SELF_HOSTED_FONTS on and fonts.json present, base.html uses these
+# instead of fonts.googleapis.com.
+import os
+import re
+import io
+import sys
+import json
+import glob
+import shutil
+import hashlib
+import argparse
+import tempfile
+import urllib.request
+
+from .config import Config
+from .assets import FONT_DIR
+
+GOOGLE_FONT_URLS = [
+    'https://fonts.googleapis.com/css2?family=Special+Elite&display=swap',
+    'https://fonts.googleapis.com/css2?family=Poppins:ital,wght@0,200;0,300;0,400;0,500;0,600;0,700;1,200;1,300;1,400;1,500;1,600;1,700&display=swap',
+    'https://fonts.googleapis.com/css2?family=IM+Fell+English:ital@0;1&display=swap',
+]
+# Google only serves woff2 to browsers it recognises
+USER_AGENT = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/124.0 Safari/537.36')
+# (family, weight, style) rendered above the fold on every page
+DEFAULT_PRELOAD = ['Poppins:400:normal', 'Special Elite:400:normal']
+
+FACE_PATTERN = re.compile(r'(?:/\*\s*([\w-]+)\s*\*/\s*)?@font-face\s*\{([^}]*)\}')
+DESCRIPTOR_PATTERN = re.compile(r'([\w-]+)\s*:\s*([^;]+);')
+URL_PATTERN = re.compile(r'url\(([^)]+)\)')
+
+
+# ==============================
+# GOOGLE FONTS CSS
+# ==============================
+def fetch(url):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def parse_faces(css):
+    """Yield one dict per @font-face: family, weight, style, subset, url, unicode_range."""
+    for match in FACE_PATTERN.finditer(css):
+        subset, body = match.groups()
+        descriptors = {k.lower(): v.strip() for k, v in DESCRIPTOR_PATTERN.findall(body + ';')}
+        url = URL_PATTERN.search(descriptors.get('src', ''))
+        if not url:
+            continue
+        yield {
+            'family': descriptors['font-family'].strip('\'"'),
+            'weight': descriptors.get('font-weight', '400'),
+            'style': descriptors.get('font-style', 'normal'),
+            'subset': subset or 'all',
+            'url': url.group(1).strip('\'"'),
+            'unicode_range': descriptors.get('unicode-range'),
+        }
+
+
+def parse_unicode_range(value):
+    """'U+0000-00FF, U+0131, U+4??' -> list of (start, end) code points."""
+    ranges = []
+    for part in value.split(','):
+        part = part.strip().upper().replace('U+', '')
+        if not part:
+            continue
+        low, _, high = part.partition('-')
+        high = high or low
+        start, end = int(low.replace('?', '0'), 16), int(high.replace('?', 'F'), 16)
+        ranges.append((start, end))
+    return ranges
+
+
+def covers(ranges, codepoints):
+    return [cp for cp in codepoints if any(start <= cp <= end for start, end in ranges)]
+
+
+# ==============================
+# TEXT IN USE
+# ==============================
+def used_codepoints(paths):
+    chars = set()
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            chars.update(f.read())
+    return sorted(ord(c) for c in chars if c.isprintable() or c == ' ')
+
+
+def text_files(books_dir):
+    paths = []
+    for directory in Config.TEMPLATE_DIRS:
+        paths.extend(glob.glob(os.path.join(directory, '*.html')))
+    paths.extend(glob.glob(os.path.join(books_dir, '**', '*.md'), recursive=True))
+    return paths
+
+
+def subset_font(data, codepoints):
+    """Subset woff2 bytes to codepoints; returns None without fontTools/brotli."""
+    try:
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+        import brotli  # noqa: F401 (needed for woff2)
+    except ImportError:
+        return None
+    font = TTFont(io.BytesIO(data))
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    out = io.BytesIO()
+    font.save(out)
+    return out.getvalue()
+
+
+# ==============================
+# BUILD
+# ==============================
+def face_filename(face, digest):
+    family = re.sub(r'[^a-z0-9]+', '-', face['family'].lower()).strip('-')
+    return f"{family}-{face['weight']}-{face['style']}-{face['subset']}.{digest}.woff2"
+
+
+def face_css(face, filename):
+    lines = [
+        '@font-face {',
+        f"  font-family: '{face['family']}';",
+        f"  font-style: {face['style']};",
+        f"  font-weight: {face['weight']};",
+        '  font-display: swap;',
+        f"  src: url({filename}) format('woff2');",
+    ]
+    if face['unicode_range']:
+        lines.append(f"  unicode-range: {face['unicode_range']};")
+    lines.append('}')
+    return '\n'.join(lines)
+
+
+def is_preloaded(face, preload):
+    key = f"{face['family']}:{face['weight']}:{face['style']}"
+    return key in preload and face['subset'] in ('latin', 'all')
+
+
+def build(out_dir, codepoints, do_subset=True, preload=DEFAULT_PRELOAD, urls=GOOGLE_FONT_URLS):
+    """
+    Everything is written to a temporary folder next to out_dir, which
+    replaces out_dir only once all downloads succeeded; a network error
+    leaves the current fonts in place.
+    """
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.fonts-', dir=parent)
+    try:
+        result = write_fonts(tmp_dir, codepoints, do_subset, preload, urls)
+        old_dir = None
+        if os.path.exists(out_dir):
+            old_dir = tempfile.mkdtemp(prefix='.fonts-old-', dir=parent)
+            os.rmdir(old_dir)
+            os.replace(out_dir, old_dir)
+        os.replace(tmp_dir, out_dir)
+        os.chmod(out_dir, 0o755)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return result
+
+
+def write_fonts(out_dir, codepoints, do_subset, preload, urls):
+    rules, files, preloads = [], [], []
+    skipped = subset_missing = 0
+    for url in urls:
+        for face in parse_faces(fetch(url).decode('utf-8')):
+            wanted = codepoints
+            if face['unicode_range']:
+                wanted = covers(parse_unicode_range(face['unicode_range']), codepoints)
+                if not wanted:
+                    skipped += 1
+                    continue
+            data = fetch(face['url'])
+            if do_subset:
+                subset = subset_font(data, wanted)
+                if subset is None:
+                    subset_missing += 1
+                else:
+                    data = subset
+            filename = face_filename(face, hashlib.sha256(data).hexdigest()[:10])
+            with open(os.path.join(out_dir, filename), 'wb') as f:
+                f.write(data)
+            rules.append(face_css(face, filename))
+            files.append({'file': filename, 'family': face['family'], 'bytes': len(data)})
+            if is_preloaded(face, preload):
+                preloads.append(filename)
+
+    with open(os.path.join(out_dir, 'fonts.css'), 'w', encoding='utf-8', newline='\n') as f:
+        f.write('\n'.join(rules) + '\n')
+    with open(os.path.join(out_dir, 'fonts.json'), 'w', encoding='utf-8', newline='\n') as f:
+        json.dump({'css': 'fonts.css', 'preload': preloads, 'files': files}, f, indent=2)
+    return files, preloads, skipped, subset_missing
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Download and subset the web fonts into static/fonts.')
+    parser.add_argument('--static', default=Config.STATIC_DIR, help='static directory')
+    parser.add_argument('--books', default=Config.BOOKS_DIR, help='books directory (text to subset for)')
+    parser.add_argument('--no-subset', action='store_true', help='keep font files as downloaded')
+    parser.add_argument('--preload', action='append',
+                        help=f"family:weight:style to preload (repeatable, default {DEFAULT_PRELOAD})")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out_dir = os.path.join(args.static, FONT_DIR)
+    codepoints = used_codepoints(text_files(args.books))
+    files, preloads, skipped, subset_missing = build(
+        out_dir, codepoints, do_subset=not args.no_subset,
+        preload=args.preload or DEFAULT_PRELOAD)
+
+    total = sum(f['bytes'] for f in files)
+    print(f"{len(files)} font files ({total / 1024:.0f} KB) in {out_dir}, "
+          f"{skipped} unused unicode-range faces skipped, {len(preloads)} preloaded")
+    if subset_missing:
+        print("fontTools/brotli not installed: faces were not subset "
+              "(pip install fonttools brotli)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+# ==============================
+# library/health.py - Liveness and readiness probes
+# ==============================
+#   /healthz  200 while the process can answer at all
+#   /readyz   200 once the catalog, search index and prewarm are done;
+#             503 (with the reason) before that. Later rescans keep serving
+#             the previous snapshot and index, so they do not count.
+#
+# Answered by a small WSGI wrapper in front of Flask, so probes skip the
+# login check, metrics, access log and routing entirely.
+HEALTH_HEADERS = [('Content-Type', 'text/plain; charset=utf-8'), ('Cache-Control', 'no-store')]
+
+
+def readiness(state, config):
+    """Return None when ready, else a short reason."""
+    if config['PREWARM'] and not state.warm:
+        return 'warming'
+    if state.catalog.refreshing and state.catalog.peek() is None:
+        return 'loading catalog'
+    if state.search.building and not state.search.ready:
+        return 'indexing'
+    return None
+
+
+class HealthMiddleware:
+    def __init__(self, wsgi_app, state, config):
+        self.wsgi_app = wsgi_app
+        self.state = state
+        self.config = config
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO')
+        if path == '/healthz':
+            return self.respond(start_response, '200 OK', b'ok\n')
+        if path == '/readyz':
+            reason = readiness(self.state, self.config)
+            if reason is None:
+                return self.respond(start_response, '200 OK', b'ready\n')
+            return self.respond(start_response, '503 Service Unavailable',
+                                f'not ready: {reason}\n'.encode())
+        return self.wsgi_app(environ, start_response)
+
+    @staticmethod
+    def respond(start_response, status, body):
+        start_response(status, HEALTH_HEADERS + [('Content-Length', str(len(body)))])
+        return [body]
+
+
+def init_health(app, state):
+    app.wsgi_app = HealthMiddleware(app.wsgi_app, state, app.config)
@@ -0,0 +1,121 @@
+# ==============================
+# library/highlight.py - Syntax highlighting for fenced code
+# ==============================
+# ```python fences come out of markdown as
+#   <pre><code class="language-python">...</code></pre>
+# and are replaced with Pygments markup while the chapter is rendered
+# (before it goes into the render cache). Highlighted blocks are also kept
+# in their own LRU keyed by (language, hash of the code), so the same
+# snippet in many chapters, or a chapter re-rendered after an edit, is
+# only run through Pygments once. Fences without a language use
+# HIGHLIGHT_DEFAULT_LANGUAGE, or stay plain when it is None.
+#
+# The stylesheet is static/css/highlight.css, linked from base.html and
+# part of the bundle. It is generated at build time by
+# python -m library.bundle (from HIGHLIGHT_STYLE), never by the running
+# app: static/ may be read-only, and the fingerprinted URLs of
+# library/assets.py are computed from the files as they are at startup.
+#
+# Needs Pygments. Without it (or with HIGHLIGHT off) code stays plain.
+import os
+import re
+import html
+import hashlib
+
+from .render import RenderCache
+
+try:
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+except ImportError:
+    highlight = None
+
+CSS_FILE = 'css/highlight.css'
+CSS_CLASS = 'highlight'
+CODE_BLOCK = re.compile(r'<pre><code(?: class="language-([\w+#.-]+)")?>(.*?)</code></pre>', re.DOTALL)
+
+
+class Highlighter:
+    def __init__(self, cache_size, style='default', default_language=None):
+        self.cache = RenderCache(cache_size)
+        self.default_language = default_language
+        self.formatter = HtmlFormatter(cssclass=CSS_CLASS, style=style, wrapcode=True)
+        self._lexers = {}
+
+    def lexer(self, language):
+        if language not in self._lexers:
+            try:
+                self._lexers[language] = get_lexer_by_name(language)
+            except ClassNotFound:
+                self._lexers[language] = None
+        return self._lexers[language]
+
+    def block(self, language, code):
+        """Highlighted HTML for one block, or None for unknown languages."""
+        key = (language, hashlib.sha1(code.encode('utf-8')).hexdigest())
+        result = self.cache.get(key, None)
+        if result is None:
+            lexer = self.lexer(language.lower())
+            if lexer is None:
+                return None
+            result = highlight(code, lexer, self.formatter)
+            self.cache.put(key, None, result)
+        return result
+
+    def rewrite_html(self, page_html):
+        def replace(match):
+            language, code = match.groups()
+            language = language or self.default_language
+            if not language:
+                return match.group(0)
+            return self.block(language, html.unescape(code)) or match.group(0)
+
+        return CODE_BLOCK.sub(replace, page_html)
+
+    def stylesheet(self):
+        # Only rules under .highlight; the full get_style_defs() also styles every <pre>
+        selector = f'.{CSS_CLASS}'
+        return '\n'.join(self.formatter.get_background_style_defs(selector)
+                         + self.formatter.get_token_style_defs(selector))
+
+
+# ==============================
+# STYLESHEET (build time)
+# ==============================
+def stylesheet_header(style):
+    return f"/* Generated by library/highlight.py for the Pygments '{style}' style */\n"
+
+
+def stylesheet_matches(path, style):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.readline() == stylesheet_header(style)
+    except OSError:
+        return False
+
+
+def write_stylesheet(static_dir, style):
+    """Write static/css/highlight.css for style unless it is already there."""
+    path = os.path.join(static_dir, CSS_FILE)
+    if stylesheet_matches(path, style):
+        return False
+    css = Highlighter(0, style).stylesheet()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(stylesheet_header(style) + css + '\n')
+    return True
+
+
+def init_highlight(app, state):
+    if highlight is None:
+        app.logger.warning("HIGHLIGHT is on but Pygments is not installed; code blocks stay plain")
+        return
+    style = app.config['HIGHLIGHT_STYLE']
+    if not stylesheet_matches(os.path.join(app.static_folder, CSS_FILE), style):
+        app.logger.warning("static/%s was not generated for HIGHLIGHT_STYLE %r; "
+                           "run python -m library.bundle", CSS_FILE, style)
+    state.highlighter = Highlighter(app.config['HIGHLIGHT_CACHE_SIZE'], style,
+                                    app.config['HIGHLIGHT_DEFAULT_LANGUAGE'])
+    state.html_filters.append(('highlight', state.highlighter.rewrite_html))
@@ -0,0 +1,44 @@
+# ==============================
+# library/image_build.py - Generate image derivatives ahead of time
+# ==============================
+# Usage:
+#   python -m library.image_build
+#   python -m library.image_build --profile dev
+#
+# Renders every width/format library/images.py would serve for images
+# under static/ and books/, so the first readers do not pay for it.
+import os
+import sys
+import argparse
+
+from . import create_app
+from .images import fallback_format
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate image derivatives for static/ and books/.')
+    parser.add_argument('--profile', default='production')
+    args = parser.parse_args(argv)
+
+    app = create_app(args.profile, PREWARM=False, IMAGES=True)
+    pipeline = app.extensions['library'].images
+    if pipeline is None:
+        sys.exit("Pillow is not installed (pip install pillow).")
+    count = 0
+    for root_name, root in pipeline.roots.items():
+        for dirpath, _, names in os.walk(root):
+            for name in names:
+                rel = os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, '/')
+                path = pipeline.resolve(f'{root_name}/{rel}')
+                if path is None:
+                    continue
+                _, (width, _) = pipeline.source_info(path)
+                for w in pipeline.widths_for(width):
+                    for fmt in pipeline.formats + [fallback_format(path)]:
+                        pipeline.derivative(path, w, fmt)
+                        count += 1
+    print(f"{count} derivatives in {pipeline.cache_dir}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# ==============================
+# library/images.py - Responsive image derivatives
+# ==============================
+# Images under static/ and books/ are served resized through
+#
+#   /img/<width>/<format>/<source>?v=<source hash>
+#   e.g. /img/640/webp/books/some-book/images/map.png?v=3f2a9c1b0d1e2f3a
+#
+# Derivatives are generated on first request (or ahead of time with
+# python -m library.image_build) and kept in IMAGE_CACHE_DIR, keyed by the
+# source's content hash, so an edited image gets new files and a new URL.
+# Chapter <img> tags are rewritten into <picture> with AVIF/WebP srcsets,
+# width/height and loading="lazy"; templates use responsive_image().
+#
+# Needs Pillow. Without it (or with IMAGES off) images are served as
+# before and only loading="lazy" is added.
+import os
+import re
+import hashlib
+import threading
+from flask import request, url_for, send_file, abort, redirect, has_request_context
+from markupsafe import Markup, escape
+
+from .render import file_stamp
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+SOURCE_TYPES = ('.png', '.jpg', '.jpeg', '.webp')
+MIMETYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'png': 'image/png', 'jpeg': 'image/jpeg'}
+IMG_TAG = re.compile(r'<img\s([^>]*?)\s*/?>')
+ATTR = re.compile(r'([\w-]+)="([^"]*)"')
+IMMUTABLE_MAX_AGE = 31536000
+
+
+def fallback_format(path):
+    return 'jpeg' if path.lower().endswith(('.jpg', '.jpeg')) else 'png'
+
+
+# ==============================
+# PIPELINE
+# ==============================
+class ImagePipeline:
+    def __init__(self, roots, cache_dir, widths, formats, quality=75, sizes='100vw'):
+        self.roots = {name: os.path.realpath(path) for name, path in roots.items()}
+        self.cache_dir = cache_dir
+        self.widths = sorted(widths)
+        self.formats = [f for f in formats if features.check(f)]
+        self.quality = quality
+        self.sizes = sizes
+        self._info = {}  # path -> (stamp, digest, (width, height))
+        self._lock = threading.Lock()
+
+    def resolve(self, src):
+        """'static/img/a.png' or 'books/x/a.png' -> file path, or None."""
+        root_name, _, rel = src.partition('/')
+        root = self.roots.get(root_name)
+        if root is None or not rel.lower().endswith(SOURCE_TYPES):
+            return None
+        path = os.path.realpath(os.path.join(root, rel))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def source_info(self, path):
+        """(digest, (width, height)) of a source image, cached by file stamp."""
+        stamp = file_stamp(path)
+        entry = self._info.get(path)
+        if entry is None or entry[0] != stamp:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()[:16]
+            with Image.open(path) as im:
+                size = im.size
+            entry = (stamp, digest, size)
+            with self._lock:
+                self._info[path] = entry
+        return entry[1], entry[2]
+
+    def widths_for(self, original_width):
+        widths = [w for w in self.widths if w < original_width]
+        if original_width <= self.widths[-1] or not widths:
+            widths.append(min(original_width, self.widths[-1]))
+        return widths
+
+    def derivative(self, path, width, fmt):
+        """Path of the resized file, generating it on first use."""
+        digest, _ = self.source_info(path)
+        target = os.path.join(self.cache_dir, digest[:2], f"{digest}-{width}.{fmt}")
+        if os.path.exists(target):
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with Image.open(path) as im:
+            height = max(1, round(im.height * width / im.width))
+            resized = im.resize((width, height), Image.LANCZOS) if width != im.width else im.copy()
+        if fmt == 'jpeg' and resized.mode != 'RGB':
+            resized = resized.convert('RGB')
+        elif resized.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            resized = resized.convert('RGBA')
+        options = {'optimize': True} if fmt in ('png', 'jpeg') else {'quality': self.quality}
+        tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        resized.save(tmp, format=fmt.upper(), **options)
+        os.replace(tmp, target)
+        return target
+
+    # ------------------------------
+    # HTML
+    # ------------------------------
+    def picture(self, src, attrs, lazy=True, sizes=None):
+        """<picture> markup for a local source, or None if it is not one."""
+        path = self.resolve(src)
+        if path is None:
+            return None
+        digest, (width, height) = self.source_info(path)
+        widths = self.widths_for(width)
+        shown = widths[-1]
+
+        def srcset(fmt):
+            return ', '.join(f"{url_for('image', width=w, fmt=fmt, src=src, v=digest)} {w}w" for w in widths)
+
+        fallback = fallback_format(path)
+        img_attrs = dict(attrs)
+        img_attrs.update({
+            'src': url_for('image', width=shown, fmt=fallback, src=src, v=digest),
+            'srcset': srcset(fallback),
+            'sizes': sizes or self.sizes,
+            'width': str(shown),
+            'height': str(round(height * shown / width)),
+            'decoding': 'async',
+        })
+        if lazy:
+            img_attrs['loading'] = 'lazy'
+        sources = ''.join(f'<source type="{MIMETYPES[fmt]}" srcset="{srcset(fmt)}" sizes="{img_attrs["sizes"]}">'
+                          for fmt in self.formats)
+        return f'<picture>{sources}<img {format_attrs(img_attrs)}></picture>'
+
+    def rewrite_html(self, html):
+        """Turn local <img> tags of rendered markdown into <picture>."""
+        prefix = request.script_root if has_request_context() else ''
+
+        def replace(match):
+            attrs = dict(ATTR.findall(match.group(1)))
+            src = attrs.get('src', '')
+            if src.startswith(prefix + '/'):
+                picture = self.picture(src[len(prefix) + 1:], {k: v for k, v in attrs.items() if k != 'src'})
+                if picture:
+                    return picture
+            return lazy_img(attrs)
+
+        return IMG_TAG.sub(replace, html)
+
+
+def format_attrs(attrs):
+    return ' '.join(f'{k}="{escape(v)}"' for k, v in attrs.items())
+
+
+def lazy_img(attrs):
+    attrs = dict(attrs, loading='lazy', decoding='async')
+    return f'<img {format_attrs(attrs)}>'
+
+
+def lazy_images(html):
+    """Only add loading="lazy" (no Pillow or IMAGES off)."""
+    return IMG_TAG.sub(lambda m: lazy_img(ATTR.findall(m.group(1))), html)
+
+
+# ==============================
+# ROUTE AND TEMPLATE HELPER
+# ==============================
+def init_images(app, state):
+    if app.config['IMAGES'] and Image is None:
+        app.logger.warning("IMAGES is on but Pillow is not installed; serving originals")
+    if app.config['IMAGES'] and Image is not None:
+        state.images = ImagePipeline(
+            {'static': app.static_folder, 'books': app.config['BOOKS_DIR']},
+            app.config['IMAGE_CACHE_DIR'],
+            app.config['IMAGE_WIDTHS'],
+            app.config['IMAGE_FORMATS'],
+            quality=app.config['IMAGE_QUALITY'],
+            sizes=app.config['IMAGE_SIZES'],
+        )
+    pipeline = state.images
+    state.html_filters.append(('images', pipeline.rewrite_html if pipeline else lazy_images))
+
+    @app.template_global()
+    def responsive_image(filename, alt='', lazy=True, sizes=None, **attrs):
+        """<picture> for static/<filename>, or a plain <img> without the pipeline."""
+        attrs = {k.rstrip('_'): v for k, v in attrs.items()}
+        attrs['alt'] = alt
+        if pipeline is not None:
+            picture = pipeline.picture(f'static/{filename}', attrs, lazy=lazy, sizes=sizes)
+            if picture:
+                return Markup(picture)
+        attrs = dict({'src': url_for('static', filename=filename)}, **attrs)
+        return Markup(lazy_img(attrs) if lazy else f'<img {format_attrs(attrs)}>')
+
+    if pipeline is None:
+        return
+
+    # static/ images (the hero on the logged-out home page) are public like
+    # /static itself; book images still need the login cookie
+    state.public_endpoints.add('image')
+
+    @app.route('/img/<int:width>/<fmt>/<path:src>')
+    def image(width, fmt, src):
+        if (app.config['PASSWORD_ENABLED'] and not src.startswith('static/')
+                and request.cookies.get('access_token') != 'ok'):
+            return redirect(url_for('login'))
+        path = pipeline.resolve(src)
+        if path is None or fmt not in pipeline.formats + [fallback_format(path)]:
+            abort(404)
+        digest, (original_width, _) = pipeline.source_info(path)
+        if width not in pipeline.widths_for(original_width):
+            abort(404)
+        response = send_file(pipeline.derivative(path, width, fmt), mimetype=MIMETYPES[fmt],
+                             max_age=IMMUTABLE_MAX_AGE if request.args.get('v') == digest else 300)
+        if request.args.get('v') == digest:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        return response
+
@@ -0,0 +1,114 @@
+# ==============================
+# library/instrument.py - Request timing and /metrics
+# ==============================
+# Adds a Server-Timing header so the browser dev tools show how long the
+# app itself spent on each page, and records per-endpoint latency, status
+# codes, bytes sent and in-flight requests for Prometheus.
+#
+# Every sample carries a worker="<pid>" label. Under launcher.py
+# --workers N each forked worker keeps its own counters and a scrape of
+# /metrics reaches whichever worker accepted it, so series are per worker
+# and dashboards aggregate them, e.g.
+#   sum without (worker) (rate(library_requests_total[5m]))
+# A restarted worker shows up as a new series starting from zero.
+import os
+import hmac
+import time
+from flask import g, request, abort, Response
+
+from .metrics import Registry
+from .accesslog import on_body_sent
+from .config import PREWARM_ENVIRON
+
+
+def init_instrumentation(app, state):
+    registry = state.metrics = Registry(const_labels=lambda: [('worker', os.getpid())])
+    latency = registry.histogram('library_request_duration_seconds',
+                                 'Time spent handling a request.', ['endpoint'])
+    requests_total = registry.counter('library_requests_total',
+                                      'Requests handled, by endpoint and status code.',
+                                      ['endpoint', 'status'])
+    bytes_sent = registry.counter('library_response_bytes_total',
+                                  'Response body bytes sent.', ['endpoint'])
+    in_flight = registry.gauge('library_requests_in_flight',
+                               'Requests currently being handled.')
+    registry.add_collector(lambda: collect_state(state))
+
+    # ------------------------------
+    # Request hooks
+    # ------------------------------
+    @app.before_request
+    def start_timer():
+        if request.environ.get(PREWARM_ENVIRON):
+            return
+        g.request_started = time.perf_counter()
+        in_flight.inc()
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('request_started')
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            endpoint = request.endpoint or 'none'
+            latency.observe(elapsed, endpoint)
+            requests_total.inc(endpoint, response.status_code)
+            on_body_sent(response, lambda sent: bytes_sent.inc(endpoint, amount=sent))
+            response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.2f}')
+        return response
+
+    @app.teardown_request
+    def stop_timer(exc):
+        if g.pop('request_started', None) is not None:
+            in_flight.dec()
+
+    # ------------------------------
+    # Metrics endpoint
+    # ------------------------------
+    # Scrapers use METRICS_TOKEN instead of the login cookie
+    state.public_endpoints.add('metrics')
+
+    @app.route('/metrics')
+    def metrics():
+        token = app.config['METRICS_TOKEN']
+        if token:
+            sent = request.headers.get('Authorization', '').encode('utf-8')
+            if not hmac.compare_digest(sent, f'Bearer {token}'.encode('utf-8')):
+                abort(403)
+        elif app.config['PASSWORD_ENABLED'] and request.cookies.get('access_token') != 'ok':
+            abort(403)
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def collect_state(state):
+    """Cache and index numbers that live on the shared objects."""
+    caches = [('render', state.render_cache), ('layout', state.layout_cache)]
+    if state.highlighter is not None:
+        caches.append(('highlight', state.highlighter.cache))
+    search_stats = state.search.stats()
+    snap = state.catalog.peek()
+    samples = [
+        ('library_cache_hits_total', 'Cache hits.', 'counter', ['cache'],
+         [((name,), cache.hits) for name, cache in caches]),
+        ('library_cache_misses_total', 'Cache misses.', 'counter', ['cache'],
+         [((name,), cache.misses) for name, cache in caches]),
+        ('library_cache_evictions_total', 'Cache evictions.', 'counter', ['cache'],
+         [((name,), cache.evictions) for name, cache in caches]),
+        ('library_cache_entries', 'Entries held in the cache.', 'gauge', ['cache'],
+         [((name,), len(cache)) for name, cache in caches]),
+        ('library_cache_bytes', 'Characters of HTML held in the cache.', 'gauge', ['cache'],
+         [((name,), cache.nbytes) for name, cache in caches]),
+        ('library_index_documents', 'Documents in the search index.', 'gauge', ['index'],
+         [(('search',), search_stats['documents'])]),
+        ('library_index_bytes', 'Characters of text in the search index.', 'gauge', ['index'],
+         [(('search',), search_stats['bytes'])]),
+        ('library_catalog_files', 'Markdown files in the catalog.', 'gauge', [],
+         [((), len(snap.files) if snap else 0)]),
+    ]
+    if state.access_log:
+        samples.extend([
+            ('library_access_log_written_total', 'Access log records written.', 'counter', [],
+             [((), state.access_log.written)]),
+            ('library_access_log_dropped_total', 'Access log records dropped on a full queue.',
+             'counter', [], [((), state.access_log.dropped)]),
+        ])
+    return samples
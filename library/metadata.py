@@ -0,0 +1,145 @@
+# ==============================
+# library/metadata.py - Front matter of the markdown files
+# ==============================
+# A chapter may start with YAML (---) or TOML (+++) front matter:
+#
+#   ---
+#   title: The Long Road
+#   order: 2
+#   tags: [travel, winter]
+#   summary: Setting out before the snow.
+#   date: 2024-11-02
+#   ---
+#
+# title replaces the name derived from the file name, order sorts a
+# chapter (or, in a folder's README, the folder) before the unordered
+# ones, tags feed the /tags/<tag> pages. A README's front matter describes
+# its folder. The block is removed before the markdown is rendered.
+#
+# Files are parsed when the catalog scans them and again only when their
+# (mtime, size) changes. YAML needs PyYAML; TOML uses tomllib.
+import os
+import re
+import datetime
+import threading
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+DELIMITERS = {'---': 'yaml', '+++': 'toml'}
+
+
+# ==============================
+# PARSING
+# ==============================
+def load_block(kind, text):
+    """dict from the text between the delimiters, {} if it cannot be read."""
+    try:
+        if kind == 'yaml' and yaml is not None:
+            data = yaml.safe_load(text)
+        elif kind == 'toml' and tomllib is not None:
+            data = tomllib.loads(text)
+        else:
+            return {}
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def split_front_matter(content):
+    """
+    (raw metadata dict, markdown without the front matter block). A block
+    that does not parse to a non-empty mapping is not front matter (e.g. a
+    chapter opening with a --- rule) and the content is left untouched.
+    """
+    first, _, rest = content.lstrip('\ufeff').partition('\n')
+    kind = DELIMITERS.get(first.strip())
+    if kind is None:
+        return {}, content
+    match = re.search(r'^' + re.escape(first.strip()) + r'[ \t]*\r?$', rest, re.MULTILINE)
+    if match is None:
+        return {}, content
+    data = load_block(kind, rest[:match.start()])
+    if not data:
+        return {}, content
+    return data, rest[match.end():].lstrip('\r\n')
+
+
+def clean(data):
+    """Keep the known fields, with predictable types."""
+    meta = {}
+    if data.get('title'):
+        meta['title'] = str(data['title']).strip()
+    if isinstance(data.get('order'), (int, float)) and not isinstance(data['order'], bool):
+        meta['order'] = data['order']
+    tags = data.get('tags') or []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    tags = [str(t).strip() for t in tags if str(t).strip()]
+    if tags:
+        meta['tags'] = list(dict.fromkeys(tags))
+    if data.get('summary'):
+        meta['summary'] = str(data['summary']).strip()
+    date = data.get('date')
+    if isinstance(date, (datetime.date, datetime.datetime)):
+        meta['date'] = date.isoformat()[:10]
+    elif date:
+        meta['date'] = str(date).strip()
+    return meta
+
+
+def read_front_matter(path):
+    """Front matter of a file, reading only as far as the closing delimiter."""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        first = f.readline()
+        if first.lstrip('\ufeff').strip() not in DELIMITERS:
+            return {}
+        lines = [first]
+        for line in f:
+            lines.append(line)
+            if line.strip() == first.lstrip('\ufeff').strip():
+                break
+    return clean(split_front_matter(''.join(lines))[0])
+
+
+def tag_key(tag):
+    return tag.strip().lower()
+
+
+# ==============================
+# INDEX
+# ==============================
+class MetadataIndex:
+    """Front matter per file, re-read only when the file changes."""
+
+    def __init__(self):
+        self._data = {}  # path -> (stamp, meta)
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return {}
+        stamp = (st.st_mtime_ns, st.st_size)
+        entry = self._data.get(path)
+        if entry is None or entry[0] != stamp:
+            entry = (stamp, read_front_matter(path))
+            with self._lock:
+                self._data[path] = entry
+        return entry[1]
+
+    def build(self, files):
+        """{url_path: meta} for the (url_path, full_path) pairs of a scan."""
+        index = {url_path: self.get(full_path) for url_path, full_path in files}
+        with self._lock:
+            known = {full_path for _, full_path in files}
+            for path in [p for p in self._data if p not in known]:
+                del self._data[path]
+        return index
@@ -0,0 +1,172 @@
+# ==============================
+# library/metrics.py - Counters, gauges and histograms (Prometheus format)
+# ==============================
+# Waitress serves requests from a fixed pool of threads. Each metric keeps
+# one shard (a plain dict) per thread, so recording a value is a dict
+# update without any lock; the shards are only summed when /metrics is
+# scraped.
+import threading
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+# ==============================
+# PER-THREAD SHARDS
+# ==============================
+class Sharded:
+    """Base for metrics whose values live in one dict per thread."""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()  # only taken when a new thread appears
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _shard_copies(self):
+        with self._lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+
+class Counter(Sharded):
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def collect(self):
+        totals = {}
+        for shard in self._shard_copies():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return [(self.name, key, value) for key, value in sorted(totals.items())]
+
+
+class Gauge(Counter):
+    """A counter that may go down (e.g. requests in flight)."""
+    kind = 'gauge'
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(Sharded):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        shard = self._shard()
+        entry = shard.get(label_values)
+        if entry is None:
+            # [per-bucket counts..., +Inf count, sum]
+            entry = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[i] += 1
+                break
+        else:
+            entry[len(self.buckets)] += 1
+        entry[-1] += value
+
+    def _totals(self):
+        totals = {}
+        for shard in self._shard_copies():
+            for key, entry in shard.items():
+                total = totals.setdefault(key, [0] * (len(entry) - 1) + [0.0])
+                for i, value in enumerate(entry):
+                    total[i] += value
+        return sorted(totals.items())
+
+    def collect(self):
+        samples = []
+        for key, entry in self._totals():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), entry[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else format_value(bound)
+                samples.append((self.name + '_bucket', key + (le,), cumulative))
+            samples.append((self.name + '_count', key, cumulative))
+            samples.append((self.name + '_sum', key, entry[-1]))
+        return samples
+
+
+# ==============================
+# REGISTRY
+# ==============================
+class Registry:
+    def __init__(self, const_labels=None):
+        self._metrics = []
+        self._collectors = []
+        # Callable returning [(name, value)] added to every sample at render time
+        self.const_labels = const_labels
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """
+        Register a callable returning [(name, help, kind, labels, samples)]
+        where samples is a list of (label_values, value). Used for values
+        that already live elsewhere, like cache and index sizes.
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        const = tuple(self.const_labels()) if self.const_labels else ()
+        const_names = tuple(name for name, _ in const)
+        const_values = tuple(value for _, value in const)
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, key, value in metric.collect():
+                label_names = const_names + metric.labels + (('le',) if name.endswith('_bucket') else ())
+                lines.append(f'{name}{format_labels(label_names, const_values + key)} {format_value(value)}')
+        for collector in self._collectors:
+            for name, help_text, kind, labels, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for key, value in samples:
+                    lines.append(f'{name}{format_labels(const_names + tuple(labels), const_values + tuple(key))} '
+                                 f'{format_value(value)}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,49 @@
+# ==============================
+# library/minify.py - Whitespace and comment stripping for HTML
+# ==============================
+# Applied once, never per request:
+#   - to rendered markdown, before it goes into the render cache
+#   - to template sources as Jinja loads them (base.html and friends),
+#     so the compiled templates already produce compact HTML
+#
+# Runs of whitespace collapse to one space (what the browser shows
+# anyway) and <!-- comments --> are dropped. <pre>, <code>, <textarea>,
+# <script> and <style> are kept byte for byte.
+import re
+from jinja2 import BaseLoader
+
+PRESERVE = re.compile(r'(<(pre|code|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+# Comments wrapping Jinja tags are kept, removing them could unbalance blocks
+COMMENT = re.compile(r'<!--(?!\[if)(?:(?!\{[%{#]).)*?-->', re.DOTALL)
+WHITESPACE = re.compile(r'\s+')
+
+
+def minify_html(html):
+    parts = PRESERVE.split(html)
+    out = []
+    # split() yields text, whole preserved element, tag name, text, ...
+    for i in range(0, len(parts), 3):
+        text = COMMENT.sub('', parts[i])
+        out.append(WHITESPACE.sub(' ', text))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return ''.join(out)
+
+
+class MinifyingLoader(BaseLoader):
+    """Wraps another Jinja loader and minifies each template source once."""
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = self.loader.get_source(environment, template)
+        return minify_html(source), filename, uptodate
+
+    def list_templates(self):
+        return self.loader.list_templates()
+
+
+def init_minify(app, state):
+    app.jinja_loader = MinifyingLoader(app.jinja_loader)
+    state.html_filters.append(('minify', minify_html))
@@ -0,0 +1,197 @@
+# ==============================
+# library/profiler.py - On-demand profiling of a single request
+# ==============================
+# Add ?_profile=<ADMIN_SECRET> (or an X-Profile: <ADMIN_SECRET> header) to
+# any URL and that one request runs under the profiler. Two files are
+# written to PROFILE_DIR:
+#
+#   <time>-<path>.pstats     cProfile data   (python -m pstats file)
+#   <time>-<path>.collapsed  sampled stacks  (flamegraph.pl / speedscope)
+#
+# ?_profiler=cprofile or ?_profiler=sample records only one of the two.
+# Stored profiles are listed on /_profiles (needs the admin secret, see
+# library/admin.py).
+import io
+import os
+import re
+import sys
+import pstats
+import cProfile
+import threading
+from datetime import datetime
+from urllib.parse import parse_qs
+from flask import render_template_string, send_from_directory, abort
+
+from .admin import require_admin, secret_matches
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILERS = ('both', 'cprofile', 'sample')
+
+LISTING_TEMPLATE = """
+{% extends "base.html" %}
+{% block content %}
+<h2 class="title">Request Profiles</h2>
+<div class="content">
+  {% if not profiles %}
+    <p>No profiles yet. Add <code>?_profile=&lt;secret&gt;</code> to a URL to record one.</p>
+  {% else %}
+    <table class="table">
+      <tr><th>File</th><th>Size</th><th>Recorded</th><th></th></tr>
+      {% for p in profiles %}
+        <tr>
+          <td><a href="{{ url_for('profile_file', name=p.name) }}">{{ p.name }}</a></td>
+          <td>{{ p.size }}</td>
+          <td>{{ p.mtime }}</td>
+          <td>{% if p.name.endswith('.pstats') %}<a href="{{ url_for('profile_summary', name=p.name) }}">summary</a>{% endif %}</td>
+        </tr>
+      {% endfor %}
+    </table>
+  {% endif %}
+</div>
+{% endblock %}
+"""
+
+SUMMARY_TEMPLATE = """
+{% extends "base.html" %}
+{% block content %}
+<h2 class="title">{{ name }}</h2>
+<pre>{{ summary }}</pre>
+{% endblock %}
+"""
+
+
+# ==============================
+# STACK SAMPLER
+# ==============================
+class StackSampler:
+    """Collects the stacks of one thread every `interval` seconds."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+# ==============================
+# WSGI MIDDLEWARE
+# ==============================
+class ProfilerMiddleware:
+    def __init__(self, wsgi_app, secret, profile_dir, interval):
+        self.wsgi_app = wsgi_app
+        self.secret = secret
+        self.profile_dir = profile_dir
+        self.interval = interval
+
+    def __call__(self, environ, start_response):
+        query = parse_qs(environ.get('QUERY_STRING', ''))
+        token = environ.get(PROFILE_HEADER) or query.get('_profile', [''])[0]
+        if not secret_matches(token, self.secret):
+            return self.wsgi_app(environ, start_response)
+        mode = query.get('_profiler', ['both'])[0]
+        if mode not in PROFILERS:
+            mode = 'both'
+        return self.profile(environ, start_response, mode)
+
+    def profile(self, environ, start_response, mode):
+        profiler = cProfile.Profile() if mode in ('both', 'cprofile') else None
+        sampler = None
+        if mode in ('both', 'sample'):
+            sampler = StackSampler(threading.get_ident(), self.interval)
+            sampler.start()
+        if profiler:
+            profiler.enable()
+        try:
+            # Consume the body inside the profiler so streamed responses count
+            app_iter = self.wsgi_app(environ, start_response)
+            try:
+                body = list(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        finally:
+            if profiler:
+                profiler.disable()
+            if sampler:
+                sampler.stop()
+            self.save(environ, profiler, sampler)
+        return body
+
+    def save(self, environ, profiler, sampler):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', environ.get('PATH_INFO', '/')).strip('-') or 'root'
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        base = os.path.join(self.profile_dir, f"{stamp}-{slug[:80]}")
+        if profiler:
+            profiler.dump_stats(base + '.pstats')
+        if sampler:
+            with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+                f.write(sampler.collapsed())
+
+
+# ==============================
+# LISTING ROUTES
+# ==============================
+def init_profiler(app, state):
+    profile_dir = app.config['PROFILE_DIR']
+    app.wsgi_app = ProfilerMiddleware(app.wsgi_app, app.config['ADMIN_SECRET'], profile_dir,
+                                      app.config['PROFILE_SAMPLE_INTERVAL'])
+    state.public_endpoints.update({'profiles', 'profile_file', 'profile_summary'})
+
+    def profile_path(name):
+        path = os.path.join(profile_dir, os.path.basename(name))
+        if not os.path.isfile(path):
+            abort(404)
+        return path
+
+    @app.route('/_profiles')
+    def profiles():
+        require_admin()
+        listing = []
+        if os.path.isdir(profile_dir):
+            for name in sorted(os.listdir(profile_dir), reverse=True):
+                st = os.stat(os.path.join(profile_dir, name))
+                listing.append({
+                    'name': name,
+                    'size': st.st_size,
+                    'mtime': datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+                })
+        return render_template_string(LISTING_TEMPLATE, profiles=listing, title="Profiles")
+
+    @app.route('/_profiles/<name>')
+    def profile_file(name):
+        require_admin()
+        profile_path(name)
+        return send_from_directory(profile_dir, os.path.basename(name), as_attachment=True)
+
+    @app.route('/_profiles/<name>/summary')
+    def profile_summary(name):
+        require_admin()
+        path = profile_path(name)
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(40)
+        return render_template_string(SUMMARY_TEMPLATE, name=name, summary=out.getvalue(),
+                                      title="Profile Summary")
@@ -0,0 +1,176 @@
+# ==============================
+# library/render.py - Markdown to HTML with an in-memory cache
+# ==============================
+import os
+import re
+import html
+import threading
+from collections import OrderedDict, namedtuple
+from flask import g, url_for, request, has_request_context
+import markdown
+from markdown.extensions.toc import TocExtension, slugify_unicode
+
+from .tracing import span
+from .metadata import split_front_matter
+
+MARKDOWN_EXTENSIONS = ['nl2br', 'fenced_code']
+# Heading ids, a permalink per heading and the table of contents, all
+# produced by the same conversion
+TOC_OPTIONS = {'slugify': slugify_unicode, 'permalink': '#', 'permalink_class': 'headerlink',
+               'permalink_title': 'Link to this section'}
+
+
+def entry_size(value):
+    return value.nbytes if hasattr(value, 'nbytes') else len(value)
+
+
+# ==============================
+# RENDER CACHE
+# ==============================
+class RenderCache:
+    """
+    Small thread-safe LRU of rendered pages. Entries are stored with the
+    file's (mtime, size) stamp, so an edited chapter is re-rendered on
+    the next request without any explicit invalidation.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+
+    def get(self, key, stamp):
+        if not self.maxsize:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] != stamp:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def contains(self, key, stamp):
+        """Like get() but without touching LRU order or hit counters."""
+        entry = self._data.get(key)
+        return entry is not None and entry[0] == stamp
+
+    def put(self, key, stamp, value):
+        if not self.maxsize:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= entry_size(old[1])
+            self._data[key] = (stamp, value)
+            self.nbytes += entry_size(value)
+            while len(self._data) > self.maxsize:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.nbytes -= entry_size(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+def resolve_md_file(books_dir, md_path):
+    """Markdown file behind /books/<md_path>: README.md for folders."""
+    folder_path = os.path.join(books_dir, md_path)
+    if os.path.isdir(folder_path):
+        return os.path.join(folder_path, 'README.md')
+    return folder_path if md_path.endswith('.md') else folder_path + '.md'
+
+
+def file_stamp(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+# ==============================
+# MARKDOWN CONVERSION
+# ==============================
+class Fragment(namedtuple('Fragment', 'html toc toc_html')):
+    """
+    A rendered page: its HTML, the headings as a flat list of
+    {'level', 'id', 'title'} and the same list as nested <ul> markup.
+    """
+    __slots__ = ()
+
+    @property
+    def nbytes(self):
+        return len(self.html) + len(self.toc_html) + sum(len(h['id']) + len(h['title']) for h in self.toc)
+
+
+def flatten_toc(tokens):
+    headings = []
+    for token in tokens:
+        headings.append({'level': token['level'], 'id': token['id'], 'title': html.unescape(token['name'])})
+        headings.extend(flatten_toc(token['children']))
+    return headings
+
+
+def rewrite_relative_links(content, md_path):
+    """Point ./relative links at the render_md route of the same book."""
+    def replace_relative_links(match):
+        link = match.group(1)
+        if link.startswith('./'):
+            full_path = os.path.join(md_path, link[2:]).replace('\\', '/')
+            return f'({url_for("render_md", md_path=full_path)})'
+        return f'({link})'
+
+    return re.sub(r'\((.*?)\)', replace_relative_links, content)
+
+
+def render_markdown(md_file, md_path, filters=()):
+    """
+    Returns a Fragment. filters are (name, function) pairs applied to the
+    HTML in order, e.g. the image rewriting of library/images.py; their
+    cost is cached too.
+    """
+    with span('read'):
+        with open(md_file, 'r', encoding='utf-8') as f:
+            _, content = split_front_matter(f.read())
+    with span('links'):
+        # ./links are relative to the folder for README pages, and to the
+        # chapter's own folder for chapters
+        is_folder = os.path.basename(md_file) == 'README.md' and \
+            os.path.basename(md_path) not in ('README', 'README.md')
+        content = rewrite_relative_links(content, md_path if is_folder else os.path.dirname(md_path))
+    with span('markdown'):
+        md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS + [TocExtension(**TOC_OPTIONS)])
+        page_html = md.convert(content)
+    for name, func in filters:
+        with span(name):
+            page_html = func(page_html)
+    return Fragment(page_html, flatten_toc(md.toc_tokens), md.toc)
+
+
+def cache_key(md_path):
+    """
+    Render cache key. Links in the HTML come from url_for and carry the
+    mount point (SCRIPT_NAME), so it is part of the key.
+    """
+    return (request.script_root if has_request_context() else '', md_path)
+
+
+def render_cached(cache, md_file, md_path, filters=()):
+    """The page's Fragment, rendered on a miss."""
+    stamp = file_stamp(md_file)
+    key = cache_key(md_path)
+    fragment = cache.get(key, stamp)
+    if has_request_context():
+        g.render_cache = 'miss' if fragment is None else 'hit'
+    if fragment is None:
+        fragment = render_markdown(md_file, md_path, filters)
+        cache.put(key, stamp, fragment)
+    return fragment
@@ -0,0 +1,122 @@
+# ==============================
+# library/search.py - Search backends
+# ==============================
+# 'scan'  - reads every markdown file on each query (no memory cost)
+# 'index' - keeps file contents in memory, reloaded when the catalog
+#           snapshot changes
+import re
+import threading
+
+from .metadata import split_front_matter
+
+
+def make_result(url_path, content, query):
+    """Build one search hit, or None when the query is not in content."""
+    match = re.search(re.escape(query), content, re.IGNORECASE)
+    if not match:
+        return None
+    pos = match.start()
+    snippet_start = max(0, pos - 30)
+    snippet = content[snippet_start: pos + 150]
+    snippet = re.sub(r'[#>*_`~\-]+', '', snippet)
+    snippet = re.sub(r'<[^>]*>', '', snippet).strip()
+    parts = url_path.split('/')
+    return {
+        'path': url_path,
+        'book': parts[0],
+        'volume': parts[-1],
+        'match_snippet': snippet + '...'
+    }
+
+
+def read_text(full_path):
+    try:
+        with open(full_path, 'r', encoding='utf-8') as f:
+            return split_front_matter(f.read())[1]
+    except Exception:
+        return None
+
+
+# ==============================
+# BACKENDS
+# ==============================
+class ScanSearch:
+    building = False
+    ready = True
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def build(self):
+        pass
+
+    def stats(self):
+        return {'documents': 0, 'bytes': 0}
+
+    def search(self, query):
+        results = []
+        for url_path, full_path in self.catalog.snapshot().files:
+            content = read_text(full_path)
+            if content is None:
+                continue
+            result = make_result(url_path, content, query)
+            if result:
+                results.append(result)
+        return results
+
+
+class IndexSearch:
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._docs = []
+        self._version = None
+        self._lock = threading.Lock()
+        self.building = False
+
+    def build(self):
+        snap = self.catalog.snapshot()
+        with self._lock:
+            if self._version == snap.version:
+                return
+            self.building = True
+            try:
+                docs = []
+                for url_path, full_path in snap.files:
+                    content = read_text(full_path)
+                    if content is not None:
+                        docs.append((url_path, content))
+                self._docs = docs
+                self._version = snap.version
+            finally:
+                self.building = False
+
+    @property
+    def ready(self):
+        """True once a first index exists (later rebuilds swap it in)."""
+        return self._version is not None
+
+    def stats(self):
+        docs = self._docs
+        return {'documents': len(docs), 'bytes': sum(len(content) for _, content in docs)}
+
+    def search(self, query):
+        self.build()
+        results = []
+        for url_path, content in self._docs:
+            result = make_result(url_path, content, query)
+            if result:
+                results.append(result)
+        return results
+
+
+BACKENDS = {
+    'scan': ScanSearch,
+    'index': IndexSearch,
+}
+
+
+def make_search(name, catalog):
+    try:
+        return BACKENDS[name](catalog)
+    except KeyError:
+        raise ValueError(f"Unknown SEARCH_BACKEND: {name!r}")
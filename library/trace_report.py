@@ -0,0 +1,65 @@
+# ==============================
+# library/trace_report.py - Per-stage percentiles from trace files
+# ==============================
+# Usage:
+#   python -m library.trace_report var/traces.jsonl [more.jsonl ...]
+#
+# Prints p50/p95/p99 per endpoint and stage (see library/tracing.py),
+# plus the whole request as stage "total".
+import sys
+import json
+import argparse
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def aggregate(lines):
+    """
+    Group durations by (endpoint, stage). Repeated spans of one stage in
+    the same request are added up first.
+    """
+    stages = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        per_request = {'total': record['total_ms']}
+        for name, ms in record['spans']:
+            per_request[name] = per_request.get(name, 0.0) + ms
+        for name, ms in per_request.items():
+            stages.setdefault((record['endpoint'], name), []).append(ms)
+    return stages
+
+
+def report(stages, out=sys.stdout):
+    out.write(f"{'endpoint':<14} {'stage':<12} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}\n")
+    for (endpoint, name), values in sorted(stages.items()):
+        values.sort()
+        out.write(f"{endpoint:<14} {name:<12} {len(values):>7} "
+                  f"{percentile(values, 0.50):>9.3f} {percentile(values, 0.95):>9.3f} "
+                  f"{percentile(values, 0.99):>9.3f}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-stage percentiles from a trace file.')
+    parser.add_argument('trace_file', nargs='+')
+    args = parser.parse_args(argv)
+    stages = {}
+    for path in args.trace_file:
+        with open(path, encoding='utf-8') as f:
+            for key, values in aggregate(f).items():
+                stages.setdefault(key, []).extend(values)
+    report(stages)
+
+
+if __name__ == '__main__':
+    main()
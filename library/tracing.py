@@ -0,0 +1,110 @@
+# ==============================
+# library/tracing.py - Sampled per-stage tracing
+# ==============================
+# A sampled request collects one span per stage (file read, link rewrite,
+# markdown conversion, template render, ...) and is written as one JSON
+# line to TRACE_FILE:
+#
+#   {"ts": 1760000000.0, "endpoint": "render_md", "path": "/books/...",
+#    "status": 200, "total_ms": 4.1, "spans": [["read", 0.08], ...]}
+#
+# Requests that are not sampled only pay for one g lookup per span.
+# Prewarm requests are never sampled.
+#
+# Summarize a trace file with:
+#   python -m library.trace_report var/traces.jsonl
+import os
+import json
+import time
+import random
+import threading
+from flask import g, request, has_request_context
+
+from .config import PREWARM_ENVIRON
+
+
+# ==============================
+# SPANS
+# ==============================
+class Span:
+    __slots__ = ('spans', 'name', 'started')
+
+    def __init__(self, spans, name):
+        self.spans = spans
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.spans.append((self.name, (time.perf_counter() - self.started) * 1000))
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name):
+    """Time a stage of the current request if it is being traced."""
+    if has_request_context():
+        spans = g.get('trace_spans')
+        if spans is not None:
+            return Span(spans, name)
+    return NULL_SPAN
+
+
+# ==============================
+# TRACE WRITER
+# ==============================
+class TraceWriter:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+
+
+def init_tracing(app):
+    rate = app.config['TRACE_SAMPLE_RATE']
+    writer = TraceWriter(app.config['TRACE_FILE'])
+
+    @app.before_request
+    def start_trace():
+        if request.environ.get(PREWARM_ENVIRON):
+            return
+        if random.random() < rate:
+            g.trace_spans = []
+            g.trace_started = time.perf_counter()
+
+    @app.after_request
+    def finish_trace(response):
+        spans = g.pop('trace_spans', None)
+        if spans is not None:
+            writer.write({
+                'ts': round(time.time(), 3),
+                'endpoint': request.endpoint or 'none',
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round((time.perf_counter() - g.trace_started) * 1000, 3),
+                'spans': [[name, round(ms, 3)] for name, ms in spans],
+            })
+        return response
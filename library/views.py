@@ -0,0 +1,310 @@
+# ==============================
+# library/views.py - Login, books, sitemap, tags and search routes
+# ==============================
+import os
+import re
+import glob
+import mimetypes
+from flask import (render_template, render_template_string, abort, url_for, request, redirect, make_response,
+                   send_file, Response, stream_with_context, jsonify)
+from markupsafe import Markup, escape
+from werkzeug.security import safe_join
+
+from .render import render_cached, resolve_md_file
+from .metadata import tag_key
+from .tracing import span
+
+PAGE_TEMPLATE = """
+{% extends "base.html" %}
+{% block content %}
+    {{ content|safe }}
+{% endblock %}
+"""
+# Stands in for the chapter while the layout is rendered for the layout cache
+CONTENT_MARKER = '<!--library:content-->'
+# Heading ids and the in-page links pointing at them
+FRAGMENT_ID = re.compile(r'\b(id="|href="#)([^"]+)"')
+
+
+def scope_ids(html, prefix):
+    """Prefix a chapter's ids and #links so they stay unique on a combined page."""
+    return FRAGMENT_ID.sub(lambda m: f'{m.group(1)}{prefix}--{m.group(2)}"', html)
+
+
+def is_logged_in():
+    return request.cookies.get('access_token') == 'ok'
+
+
+def register_views(app, state):
+    config = app.config
+
+    # ==============================
+    # GLOBAL LOGIN ENFORCEMENT
+    # ==============================
+    @app.before_request
+    def require_login():
+        if not config['PASSWORD_ENABLED']:
+            return
+        if request.endpoint not in state.public_endpoints:
+            access_token = request.cookies.get('access_token')
+            if access_token != 'ok':
+                return redirect(url_for('login'))
+
+    # ==============================
+    # Inject login status into all templates
+    # ==============================
+    @app.context_processor
+    def inject_login_status():
+        return dict(is_logged_in=is_logged_in())
+
+    # ==============================
+    # PAGE LAYOUT
+    # ==============================
+    def layout_parts(title):
+        """
+        base.html split into the HTML before and after the page content.
+        With LAYOUT_CACHE_SIZE the layout is rendered once per (login
+        state, title) around CONTENT_MARKER and reused. The search box
+        echoes ?q=, so such requests always render it fresh.
+        """
+        cache = state.layout_cache
+        key = (is_logged_in(), title, request.script_root)
+        layout = None if 'q' in request.args else cache.get(key, None)
+        if layout is None:
+            layout = render_template_string(PAGE_TEMPLATE, content=Markup(CONTENT_MARKER), title=title)
+            if 'q' not in request.args:
+                cache.put(key, None, layout)
+        head, _, tail = layout.partition(CONTENT_MARKER)
+        return head, tail
+
+    def render_page(content, title):
+        head, tail = layout_parts(title)
+        return head + content + tail
+
+    def page_navigation(md_path):
+        """Breadcrumbs above and prev/next (+ prefetch of next) below a page."""
+        nav = state.catalog.snapshot().page_navigation(md_path)
+        if nav is None:
+            return '', ''
+        link = lambda path: url_for('render_md', md_path=path)
+        top = ''
+        if nav['crumbs']:
+            items = ''.join(f'<li class="breadcrumb-item"><a href="{link(path)}">{escape(title)}</a></li>'
+                            for title, path in nav['crumbs'])
+            top = f'<nav aria-label="breadcrumb"><ol class="breadcrumb">{items}</ol></nav>'
+        bottom = ''
+        if nav['prev'] or nav['next']:
+            prev_link = next_link = '<span></span>'
+            if nav['prev']:
+                title, path = nav['prev']
+                prev_link = f'<a href="{link(path)}" rel="prev">&larr; {escape(title)}</a>'
+            if nav['next']:
+                title, path = nav['next']
+                next_link = f'<a href="{link(path)}" rel="next">{escape(title)} &rarr;</a>'
+                bottom = f'<link rel="prefetch" href="{link(path)}">'
+            bottom += f'<nav class="chapter-nav d-flex justify-content-between mt-4">{prev_link}{next_link}</nav>'
+        return top, bottom
+
+    def page_details(meta):
+        """Date and tag links from a page's front matter."""
+        items = []
+        if meta.get('date'):
+            items.append(f'<time datetime="{escape(meta["date"])}">{escape(meta["date"])}</time>')
+        for tag in meta.get('tags', ()):
+            items.append(f'<a class="badge text-bg-secondary" href="{url_for("tag", tag=tag)}">{escape(tag)}</a>')
+        return f'<p class="page-meta small">{" ".join(items)}</p>' if items else ''
+
+    def page_toc(fragment):
+        """The chapter's cached table of contents, if it has enough headings."""
+        if len(fragment.toc) < config['TOC_MIN_HEADINGS']:
+            return ''
+        return f'<nav class="chapter-toc" aria-label="Contents">{fragment.toc_html}</nav>'
+
+    def stream_volume(md_path, title):
+        """
+        Every chapter below md_path in catalog order inside one layout,
+        streamed chapter by chapter from the render cache. Heading ids are
+        prefixed with the chapter's section id.
+        """
+        prefix = md_path.rstrip('/') + '/'
+        chapters = [(u, p) for u, p in state.catalog.snapshot().files
+                    if u.startswith(prefix) and os.path.basename(u).lower() != 'readme']
+        head, tail = layout_parts(title)
+
+        def generate():
+            yield head
+            for url_path, full_path in chapters:
+                html = render_cached(state.render_cache, full_path, url_path, state.html_filters).html
+                anchor = url_path[len(prefix):].replace('/', '-')
+                yield f'<section class="chapter" id="{anchor}">{scope_ids(html, anchor)}</section><hr>'
+            yield tail
+
+        return Response(stream_with_context(generate()), mimetype='text/html')
+
+    # ==============================
+    # LOGIN ROUTES
+    # ==============================
+    @app.route('/login', methods=['GET', 'POST'])
+    def login():
+        error = None
+        if not config['PASSWORD_ENABLED']:
+            resp = make_response(redirect(url_for('home')))
+            resp.set_cookie('access_token', 'ok', max_age=3600, path='/')
+            return resp
+
+        if request.method == 'POST':
+            pw = request.form.get('password', '')
+            if pw == config['PASSWORD']:
+                resp = make_response(redirect(url_for('home')))
+                resp.set_cookie('access_token', 'ok', max_age=3600, path='/')
+                return resp
+            else:
+                error = 'Wrong password!'
+
+        return render_template('login.html', error=error)
+
+    @app.route('/logout')
+    def logout():
+        resp = make_response(redirect(url_for('login')))
+        resp.set_cookie('access_token', '', expires=0, path='/')
+        return resp
+
+    # ==============================
+    # HOMEPAGE ROUTE
+    # ==============================
+    @app.route('/')
+    def home():
+        title = "ぷらいべーと らいぶらり"
+        return render_template('home.html', title=title, show_hero=False)
+
+    # ==============================
+    # MARKDOWN RENDERING ROUTE
+    # ==============================
+    @app.route('/books/<path:md_path>')
+    def render_md(md_path):
+        folder_path = os.path.join(config['BOOKS_DIR'], md_path)
+        md_file = resolve_md_file(config['BOOKS_DIR'], md_path)
+
+        # ?all=1 on a folder: the whole volume on one page
+        if request.args.get('all') == '1' and os.path.isdir(folder_path):
+            # No span: the chapters are rendered after the view returns
+            return stream_volume(md_path, md_path.rstrip('/').replace('-', ' ').title())
+
+        snap = state.catalog.snapshot()
+        if os.path.exists(md_file):
+            fragment = render_cached(state.render_cache, md_file, md_path, state.html_filters)
+            meta = snap.page_meta(md_path)
+            title = meta.get('title') or os.path.basename(md_file).replace('-', ' ').replace('.md', '').title()
+            with span('navigation'):
+                top, bottom = page_navigation(md_path)
+            with span('template'):
+                return render_page(top + page_details(meta) + page_toc(fragment) + fragment.html + bottom, title)
+
+        # Folder exists but no README.md - list contents
+        if os.path.isdir(folder_path):
+            folder = md_path.rstrip('/').replace('\\', '/')
+            children = [f"{folder}/{d}" for d in os.listdir(folder_path)
+                        if os.path.isdir(os.path.join(folder_path, d))]
+            children += [f"{folder}/{os.path.splitext(os.path.basename(f))[0]}"
+                         for f in glob.glob(os.path.join(folder_path, '*.md'))]
+            links = [{'name': snap.title(path),
+                      'url': url_for('render_md', md_path=path),
+                      'summary': snap.page_meta(path).get('summary')}
+                     for path in sorted(children, key=snap.sort_key)]
+            title = md_path.replace('-', ' ').title()
+            with span('template'):
+                return render_template('folder_index.html', title=title, links=links,
+                                       all_url=url_for('render_md', md_path=md_path, all=1))
+
+        abort(404)
+
+    # ==============================
+    # TABLE OF CONTENTS ROUTE
+    # ==============================
+    # The headings of a chapter for client-side navigation, taken from the
+    # render cache (the same pass that produced the page's heading ids).
+    @app.route('/toc/<path:md_path>')
+    def toc(md_path):
+        md_file = resolve_md_file(config['BOOKS_DIR'], md_path)
+        if not os.path.isfile(md_file):
+            abort(404)
+        fragment = render_cached(state.render_cache, md_file, md_path, state.html_filters)
+        response = jsonify({
+            'path': md_path,
+            'url': url_for('render_md', md_path=md_path),
+            'headings': fragment.toc,
+        })
+        response.add_etag()
+        return response.make_conditional(request)
+
+    # ==============================
+    # RAW FILE ROUTE
+    # ==============================
+    # Original .md files and book images for e-readers and sync scripts.
+    # send_file streams through wsgi.file_wrapper (or X-Sendfile when
+    # USE_X_SENDFILE is set) and answers Range, If-None-Match and
+    # If-Modified-Since itself.
+    @app.route('/raw/<path:raw_path>')
+    def raw(raw_path):
+        books_dir = os.path.realpath(config['BOOKS_DIR'])
+        full_path = safe_join(books_dir, raw_path)
+        if full_path is None or any(part.startswith('.') for part in raw_path.split('/')):
+            abort(404)
+        full_path = os.path.realpath(full_path)
+        if not full_path.startswith(books_dir + os.sep) or not os.path.isfile(full_path):
+            abort(404)
+        mimetype = 'text/markdown' if full_path.endswith('.md') else \
+            mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        return send_file(full_path, mimetype=mimetype, conditional=True)
+
+    # ==============================
+    # SITEMAP ROUTE
+    # ==============================
+    @app.route('/sitemap')
+    def sitemap():
+        with span('catalog'):
+            books_dict = state.catalog.snapshot().books
+        with span('template'):
+            return render_template('sitemap.html', books=books_dict, title="Sitemap")
+
+    # ==============================
+    # TAG ROUTES
+    # ==============================
+    # Served from the catalog snapshot, which collects the front matter
+    # tags when the books folder is scanned.
+    @app.route('/tags')
+    def tags():
+        with span('template'):
+            return render_template('tags.html', tags=state.catalog.snapshot().tags, title="Tags")
+
+    # path: tags such as ci/cd contain slashes
+    @app.route('/tags/<path:tag>')
+    def tag(tag):
+        entry = state.catalog.snapshot().tags.get(tag_key(tag))
+        if entry is None:
+            abort(404)
+        with span('template'):
+            return render_template('tags.html', tag=entry, title=f"Tag: {entry['name']}")
+
+    # ==============================
+    # SEARCH ROUTE
+    # ==============================
+    @app.route('/search')
+    def search():
+        query = request.args.get('q', '').strip()
+        results = []
+
+        if query:
+            with span('search'):
+                hits = state.search.search(query)
+            for result in hits:
+                results.append(dict(result, url=url_for('render_md', md_path=result['path'])))
+        with span('template'):
+            return render_template('search.html', title="Search Results", query=query, results=results)
+
+    # ==============================
+    # CUSTOM 404 HANDLER
+    # ==============================
+    @app.errorhandler(404)
+    def page_not_found(e):
+        return render_template('404.html', title="Page Not Found"), 404
@@ -0,0 +1,32 @@
+import pytest
+
+from library import create_app
+
+
+@pytest.fixture
+def books_dir(tmp_path):
+    """A small library: one book with one volume of three chapters."""
+    volume = tmp_path / 'books' / 'sample-book' / 'volume-1'
+    volume.mkdir(parents=True)
+    (volume / 'README.md').write_text('# Volume 1\n', encoding='utf-8')
+    for n in (1, 2, 3):
+        (volume / f'chapter-{n}.md').write_text(
+            f'# Chapter {n}\n\n## Introduction\n\nText of chapter {n}.\n', encoding='utf-8')
+    return tmp_path / 'books'
+
+
+@pytest.fixture
+def make_app(tmp_path, books_dir):
+    """create_app() on books_dir with everything it writes kept in tmp_path."""
+    def make(profile='dev', **overrides):
+        settings = dict(
+            BOOKS_DIR=str(books_dir),
+            ACCESS_LOG_FILE=str(tmp_path / 'access.jsonl'),
+            TRACE_FILE=str(tmp_path / 'traces.jsonl'),
+            PROFILE_DIR=str(tmp_path / 'profiles'),
+            IMAGE_CACHE_DIR=str(tmp_path / 'images'),
+            EXPORT_CACHE_DIR=str(tmp_path / 'exports'),
+        )
+        settings.update(overrides)
+        return create_app(profile, **settings)
+    return make
@@ -0,0 +1,29 @@
+import json
+
+
+def read_log(app, tmp_path):
+    app.extensions['library'].access_log.close()
+    with open(tmp_path / 'access.jsonl', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_streamed_response_logs_bytes_sent(make_app, tmp_path):
+    app = make_app(ACCESS_LOG=True, COMPRESS=True)
+    client = app.test_client()
+    client.set_cookie('access_token', 'ok')
+    for headers in ({}, {'Accept-Encoding': 'gzip'}):
+        with client.get('/books/sample-book/volume-1?all=1', headers=headers) as response:
+            assert response.is_streamed
+            body = response.get_data()
+    page = client.get('/books/sample-book/volume-1/chapter-1')
+    records = read_log(app, tmp_path)
+    assert [r['bytes'] for r in records][-1] == len(page.get_data())
+    assert records[-2]['bytes'] == len(body)
+    assert records[0]['bytes'] > 0
+
+
+def test_admin_secret_is_not_logged(make_app, tmp_path):
+    app = make_app(ACCESS_LOG=True, ADMIN_SECRET='adm1n-secret')
+    app.test_client().get('/_diagnostics?secret=adm1n-secret&x=1')
+    records = read_log(app, tmp_path)
+    assert records[0]['path'] == '/_diagnostics?x=1'
@@ -0,0 +1,33 @@
+SECRET = 'adm1n-secret'
+
+
+def admin_app(make_app, tmp_path):
+    profiles = tmp_path / 'profiles'
+    profiles.mkdir()
+    (profiles / '20250101-000000-000000-books.collapsed').write_text('main 1\n', encoding='utf-8')
+    return make_app(ADMIN_SECRET=SECRET)
+
+
+def test_secret_is_swapped_for_a_cookie(make_app, tmp_path):
+    client = admin_app(make_app, tmp_path).test_client()
+    response = client.get('/_profiles', query_string={'secret': SECRET})
+    assert response.status_code == 302
+    assert response.location == '/_profiles'
+    response = client.get('/_profiles')
+    assert response.status_code == 200
+    assert 'books.collapsed' in response.get_data(as_text=True)
+    assert 'secret' not in response.get_data(as_text=True)
+
+
+def test_wrong_secret_and_forged_cookie_are_refused(make_app, tmp_path):
+    client = admin_app(make_app, tmp_path).test_client()
+    assert client.get('/_profiles', query_string={'secret': 'nöpe'}).status_code == 403
+    client.set_cookie('admin_token', 'admin')
+    assert client.get('/_profiles').status_code == 403
+
+
+def test_header_needs_no_cookie(make_app, tmp_path):
+    client = admin_app(make_app, tmp_path).test_client()
+    response = client.get('/_profiles', headers={'X-Admin-Secret': SECRET})
+    assert response.status_code == 200
+    assert 'Set-Cookie' not in response.headers
@@ -0,0 +1,21 @@
+def test_dev_profile_does_not_rescan_every_request(make_app, monkeypatch):
+    app = make_app()
+    catalog = app.extensions['library'].catalog
+    scans = []
+    scan_files = catalog._scan_files
+    monkeypatch.setattr(catalog, '_scan_files', lambda: scans.append(1) or scan_files())
+    client = app.test_client()
+    client.set_cookie('access_token', 'ok')
+    for n in (1, 2, 3):
+        assert client.get(f'/books/sample-book/volume-1/chapter-{n}').status_code == 200
+    assert len(scans) <= 1
+
+
+def test_new_chapter_appears_after_ttl(make_app, books_dir):
+    app = make_app(CATALOG_TTL=0)
+    client = app.test_client()
+    client.set_cookie('access_token', 'ok')
+    assert 'rel="next"' not in client.get('/books/sample-book/volume-1/chapter-3').get_data(as_text=True)
+    (books_dir / 'sample-book' / 'volume-1' / 'chapter-4.md').write_text('# Chapter 4\n', encoding='utf-8')
+    html = client.get('/books/sample-book/volume-1/chapter-3').get_data(as_text=True)
+    assert 'href="/books/sample-book/volume-1/chapter-4" rel="next"' in html
@@ -0,0 +1,35 @@
+import tracemalloc
+
+import pytest
+
+SECRET = 'adm1n-secret'
+
+
+@pytest.fixture(autouse=True)
+def stop_tracemalloc():
+    yield
+    tracemalloc.stop()
+
+
+def test_secret_never_appears_in_forms_or_redirects(make_app):
+    client = make_app(ADMIN_SECRET=SECRET).test_client()
+    client.get('/_diagnostics', query_string={'secret': SECRET})
+    page = client.get('/_diagnostics').get_data(as_text=True)
+    assert SECRET not in page
+    response = client.post('/_diagnostics/tracemalloc')
+    assert response.status_code == 302
+    assert response.location == '/_diagnostics'
+    response = client.post('/_diagnostics/snapshot')
+    assert response.location == '/_diagnostics'
+    client.post('/_diagnostics/snapshot')
+    page = client.get('/_diagnostics').get_data(as_text=True)
+    assert '/_diagnostics/diff?a=1&amp;b=2' in page
+    assert SECRET not in page
+    assert client.get('/_diagnostics/diff?a=1&b=2').status_code == 200
+
+
+def test_post_with_secret_in_query_sets_cookie(make_app):
+    client = make_app(ADMIN_SECRET=SECRET).test_client()
+    response = client.post('/_diagnostics/tracemalloc', query_string={'secret': SECRET})
+    assert response.location == '/_diagnostics'
+    assert client.get('/_diagnostics').status_code == 200
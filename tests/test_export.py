@@ -0,0 +1,41 @@
+import io
+import zipfile
+
+
+def logged_in_client(app):
+    client = app.test_client()
+    client.set_cookie('access_token', 'ok')
+    return client
+
+
+def test_first_download_streams_then_cached_copy_matches(make_app, tmp_path):
+    client = logged_in_client(make_app())
+    with client.get('/books/sample-book/export.zip') as first:
+        assert first.status_code == 200
+        assert 'Content-Length' not in first.headers
+        data = first.get_data()
+    with client.get('/books/sample-book/export.zip') as second:
+        assert second.headers['Content-Length'] == str(len(data))
+        assert second.headers['Accept-Ranges'] == 'bytes'
+        assert second.get_data() == data
+    names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+    assert sorted(n for n in names if n.endswith('.md'))[:1] == ['sample-book/volume-1/README.md']
+    assert len(list((tmp_path / 'exports').iterdir())) == 1
+
+
+def test_epub_contains_every_chapter(make_app):
+    data = logged_in_client(make_app()).get('/books/sample-book/export.epub').get_data()
+    epub = zipfile.ZipFile(io.BytesIO(data))
+    assert epub.namelist()[0] == 'mimetype'
+    assert epub.read('mimetype') == b'application/epub+zip'
+    text = ''.join(epub.read(n).decode('utf-8') for n in epub.namelist() if n.endswith('.xhtml'))
+    for n in (1, 2, 3):
+        assert f'Chapter {n}' in text
+
+
+def test_export_needs_login_and_known_format(make_app):
+    app = make_app()
+    assert app.test_client().get('/books/sample-book/export.zip').status_code == 302
+    client = logged_in_client(app)
+    assert client.get('/books/sample-book/export.tar').status_code == 404
+    assert client.get('/books/no-such-book/export.zip').status_code == 404
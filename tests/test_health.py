@@ -0,0 +1,22 @@
+def test_ready_during_routine_rescan(make_app):
+    app = make_app(PREWARM=True, SEARCH_BACKEND='index')
+    state = app.extensions['library']
+    client = app.test_client()
+    assert client.get('/readyz').status_code == 200
+    state.catalog.refreshing = True
+    state.search.building = True
+    assert client.get('/readyz').status_code == 200
+
+
+def test_not_ready_before_first_scan(make_app):
+    app = make_app(SEARCH_BACKEND='index')
+    state = app.extensions['library']
+    client = app.test_client()
+    state.catalog.refreshing = True
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert b'loading catalog' in response.data
+    state.catalog.refreshing = False
+    state.search.building = True
+    assert b'indexing' in client.get('/readyz').data
+    assert client.get('/healthz').status_code == 200
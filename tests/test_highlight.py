@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip('pygments')
+
+from library.highlight import Highlighter
+
+
+def test_tagged_fence_is_highlighted():
+    html = Highlighter(8).rewrite_html('<pre><code class="language-python">x = 1\n</code></pre>')
+    assert html.startswith('<div class="highlight">')
+    assert '<span class="n">x</span>' in html
+
+
+def test_bare_fence_uses_default_language():
+    bare = '<pre><code>x = 1\n</code></pre>'
+    assert Highlighter(8).rewrite_html(bare) == bare
+    assert '<span class="n">x</span>' in Highlighter(8, default_language='python').rewrite_html(bare)
+
+
+def test_markdown_fence_in_a_chapter_is_highlighted(make_app, books_dir):
+    (books_dir / 'guide.md').write_text('# Guide\n\n```markdown\n*italic*\n```\n', encoding='utf-8')
+    client = make_app(HIGHLIGHT=True).test_client()
+    client.set_cookie('access_token', 'ok')
+    assert 'class="highlight"' in client.get('/books/guide').get_data(as_text=True)
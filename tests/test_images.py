@@ -0,0 +1,29 @@
+import re
+
+import pytest
+
+pytest.importorskip('PIL')
+
+
+def test_hero_derivative_is_served_without_login(make_app):
+    app = make_app(IMAGES=True)
+    response = app.test_client().get('/img/320/png/static/img/kindpng_316111.png')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+
+
+def test_login_page_links_reachable_hero(make_app):
+    client = make_app(IMAGES=True).test_client()
+    html = client.get('/login').get_data(as_text=True)
+    src = re.search(r'src="(/img/[^"]*kindpng_316111\.png[^"]*)"', html).group(1)
+    assert client.get(src.replace('&amp;', '&')).status_code == 200
+
+
+def test_book_images_still_need_login(make_app, books_dir):
+    from PIL import Image
+    Image.new('RGB', (400, 300)).save(books_dir / 'sample-book' / 'map.png')
+    client = make_app(IMAGES=True).test_client()
+    response = client.get('/img/320/png/books/sample-book/map.png')
+    assert response.status_code == 302
+    client.set_cookie('access_token', 'ok')
+    assert client.get('/img/320/png/books/sample-book/map.png').status_code == 200
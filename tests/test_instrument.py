@@ -0,0 +1,19 @@
+import re
+
+
+def bytes_sent(app, endpoint):
+    client = app.test_client()
+    client.set_cookie('access_token', 'ok')
+    text = client.get('/metrics').get_data(as_text=True)
+    match = re.search(r'library_response_bytes_total\{[^}]*endpoint="%s"[^}]*\} (\d+)' % endpoint, text)
+    return int(match.group(1))
+
+
+def test_streamed_volume_counts_bytes_sent(make_app):
+    app = make_app(INSTRUMENTATION=True)
+    client = app.test_client()
+    client.set_cookie('access_token', 'ok')
+    with client.get('/books/sample-book/volume-1?all=1') as response:
+        assert response.is_streamed
+        size = len(response.get_data())
+    assert bytes_sent(app, 'render_md') == size
@@ -0,0 +1,23 @@
+from library.metadata import split_front_matter
+
+
+def test_front_matter_is_removed():
+    meta, body = split_front_matter('---\ntitle: The Long Road\ntags: [travel]\n---\n\n# Chapter 1\n')
+    assert meta == {'title': 'The Long Road', 'tags': ['travel']}
+    assert body == '# Chapter 1\n'
+
+
+def test_toml_front_matter_is_removed():
+    meta, body = split_front_matter('+++\ntitle = "Second Part"\norder = 1\n+++\nText\n')
+    assert meta == {'title': 'Second Part', 'order': 1}
+    assert body == 'Text\n'
+
+
+def test_opening_horizontal_rule_keeps_text():
+    content = '---\nThe story begins here.\n\n---\n\nMore text'
+    assert split_front_matter(content) == ({}, content)
+
+
+def test_empty_block_keeps_text():
+    content = '---\n---\nText'
+    assert split_front_matter(content) == ({}, content)
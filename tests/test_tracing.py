@@ -0,0 +1,11 @@
+import os
+
+
+def test_prewarm_requests_are_not_traced(make_app, tmp_path):
+    app = make_app(PREWARM=True, TRACE_SAMPLE_RATE=1.0)
+    assert not os.path.exists(tmp_path / 'traces.jsonl')
+    client = app.test_client()
+    client.set_cookie('access_token', 'ok')
+    client.get('/books/sample-book/volume-1/chapter-1')
+    with open(tmp_path / 'traces.jsonl', encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
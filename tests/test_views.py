@@ -0,0 +1,122 @@
+import re
+
+import pytest
+
+
+def logged_in_client(app):
+    client = app.test_client()
+    client.set_cookie('access_token', 'ok')
+    return client
+
+
+# ==============================
+# LAYOUT CACHE
+# ==============================
+@pytest.mark.parametrize('logged_in', [True, False])
+def test_cached_layout_is_byte_identical(make_app, books_dir, logged_in):
+    (books_dir / 'sample-book' / 'volume-1' / 'chapter-2.md').write_text(
+        '---\ntitle: Second <Part> & "More"\n---\n# Chapter 2\n', encoding='utf-8')
+    # Logged out readers only see pages with the password turned off
+    uncached = make_app(LAYOUT_CACHE_SIZE=0, RENDER_CACHE_SIZE=0, PASSWORD_ENABLED=logged_in)
+    cached = make_app(LAYOUT_CACHE_SIZE=64, RENDER_CACHE_SIZE=64, PASSWORD_ENABLED=logged_in)
+    expected, client = uncached.test_client(), cached.test_client()
+    if logged_in:
+        expected.set_cookie('access_token', 'ok')
+        client.set_cookie('access_token', 'ok')
+    for path in ('/books/sample-book/volume-1/chapter-1', '/books/sample-book/volume-1/chapter-2',
+                 '/books/sample-book/volume-1'):
+        page = expected.get(path).get_data()
+        assert client.get(path).get_data() == page
+        assert client.get(path).get_data() == page  # served from the caches
+    assert cached.extensions['library'].layout_cache.hits > 0
+    assert (b'id="hero"' in page) is not logged_in
+
+
+def test_layout_cache_keeps_search_box_query(make_app):
+    client = logged_in_client(make_app(LAYOUT_CACHE_SIZE=64))
+    client.get('/books/sample-book/volume-1/chapter-1')
+    html = client.get('/books/sample-book/volume-1/chapter-1?q=needle').get_data(as_text=True)
+    assert 'value="needle"' in html
+    assert 'value="needle"' not in client.get('/books/sample-book/volume-1/chapter-1').get_data(as_text=True)
+
+
+# ==============================
+# WHOLE VOLUME (?all=1)
+# ==============================
+def test_volume_streams_every_chapter_in_order(make_app):
+    response = logged_in_client(make_app()).get('/books/sample-book/volume-1?all=1')
+    assert response.status_code == 200
+    assert response.is_streamed
+    html = response.get_data(as_text=True)
+    positions = [html.index(f'<section class="chapter" id="chapter-{n}">') for n in (1, 2, 3)]
+    assert positions == sorted(positions)
+    assert 'Volume 1</h1>' not in html  # README is not a chapter
+    assert html.rstrip().endswith('</html>')
+
+
+def test_volume_heading_ids_are_unique(make_app):
+    html = logged_in_client(make_app()).get('/books/sample-book/volume-1?all=1').get_data(as_text=True)
+    ids = re.findall(r'\bid="([^"]+)"', html)
+    assert len(ids) == len(set(ids))
+    assert 'id="chapter-2--introduction"' in html
+    assert 'href="#chapter-2--introduction"' in html
+
+
+def test_volume_needs_login(make_app):
+    response = make_app().test_client().get('/books/sample-book/volume-1?all=1')
+    assert response.status_code == 302
+    assert response.location.endswith('/login')
+
+
+def test_only_all_1_streams_the_volume(make_app):
+    client = logged_in_client(make_app())
+    for query in ('?all=0', '?all=false', ''):
+        assert 'class="chapter"' not in client.get('/books/sample-book/volume-1' + query).get_data(as_text=True)
+
+
+# ==============================
+# TAGS
+# ==============================
+def test_tag_with_slash_links_to_its_page(make_app, books_dir):
+    (books_dir / 'sample-book' / 'volume-1' / 'chapter-1.md').write_text(
+        '---\ntags: [ci/cd, Travel]\n---\n# Chapter 1\n', encoding='utf-8')
+    client = logged_in_client(make_app())
+    html = client.get('/books/sample-book/volume-1/chapter-1').get_data(as_text=True)
+    links = re.findall(r'href="(/tags/[^"]+)"', html)
+    assert links == ['/tags/ci/cd', '/tags/Travel']
+    for link in links + ['/tags/travel']:
+        page = client.get(link)
+        assert page.status_code == 200
+        assert 'chapter-1' in page.get_data(as_text=True)
+
+
+# ==============================
+# RAW FILES
+# ==============================
+def test_raw_serves_book_files(make_app):
+    response = logged_in_client(make_app()).get('/raw/sample-book/volume-1/chapter-1.md')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/markdown; charset=utf-8'
+    assert response.get_data(as_text=True).startswith('# Chapter 1')
+
+
+def test_raw_needs_login(make_app):
+    response = make_app().test_client().get('/raw/sample-book/volume-1/chapter-1.md')
+    assert response.status_code == 302
+
+
+@pytest.mark.parametrize('path', [
+    '/raw/../secret.txt',
+    '/raw/%2e%2e/secret.txt',
+    '/raw/sample-book/..%2f..%2fsecret.txt',
+    '/raw/sample-book/.hidden.md',
+    '/raw/sample-book/outside.md',
+    '/raw/sample-book',
+])
+def test_raw_stays_inside_books_dir(make_app, books_dir, path):
+    (books_dir.parent / 'secret.txt').write_text('secret', encoding='utf-8')
+    (books_dir / 'sample-book' / '.hidden.md').write_text('hidden', encoding='utf-8')
+    (books_dir / 'sample-book' / 'outside.md').symlink_to(books_dir.parent / 'secret.txt')
+    response = logged_in_client(make_app()).get(path)
+    assert response.status_code == 404
+    assert b'secret' not in response.data